@@ -2,18 +2,51 @@
 
 import logging
 
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import DOMAIN, HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
+from homeassistant.helpers import config_validation as cv, device_registry as dr
 from homeassistant.helpers.device_registry import DeviceInfo, format_mac
-from pyextron import AuthenticationError, ExtronDevice
+from homeassistant.helpers.typing import ConfigType
+from pyextron import AuthenticationError, DeviceType, ExtronDevice
 
-from custom_components.extron.const import EXTRON_DEVICE_TIMEOUT_SECONDS, OPTION_INPUT_NAMES
+from custom_components.extron.capabilities import CAPABILITY_REGISTRY, ModelCapabilities
+from custom_components.extron.codec import decode_response
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.const import (
+    CONF_DEVICE_INFORMATION,
+    CONF_DEVICE_TYPE,
+    CONF_PASSWORD,
+    DATA_FLEET,
+    DEVICE_TYPE_MATRIX_SWITCHER,
+    DOMAIN as EXTRON_DOMAIN,
+    EXTRON_DEVICE_TIMEOUT_SECONDS,
+    FLEET_MAX_CONCURRENT_SESSIONS,
+    OPTION_INPUT_NAMES,
+    OPTION_PUSH_UPDATES,
+    OPTION_RECORD_TRAFFIC,
+    POLLING_TICK_INTERVAL_SECONDS,
+    TRAFFIC_TRACE_DIRECTORY,
+    TRAFFIC_TRACE_MAX_BYTES,
+    VERBOSE_MODE,
+)
+from custom_components.extron.coordinator import (
+    ExtronCoordinator,
+    HDMISwitcherCoordinator,
+    MatrixSwitcherCoordinator,
+    SurroundSoundProcessorCoordinator,
+)
+from custom_components.extron.fleet import Fleet
+from custom_components.extron.recorder import TrafficRecorder
+from custom_components.extron.services import async_setup_services
 
 PLATFORMS: list[Platform] = [Platform.MEDIA_PLAYER, Platform.SENSOR, Platform.BUTTON, Platform.BINARY_SENSOR]
+CONFIG_SCHEMA = cv.config_entry_only_config_schema(EXTRON_DOMAIN)
 _LOGGER = logging.getLogger(__name__)
 
 
@@ -22,22 +55,41 @@ class DeviceInformation:
     mac_address: str
     model_name: str
     device_info: DeviceInfo
+    capabilities: ModelCapabilities
 
 
 @dataclass
 class ExtronConfigEntryRuntimeData:
-    device: ExtronDevice
+    connection: ExtronConnection
     device_information: DeviceInformation
     input_names: list[str]
+    coordinator: ExtronCoordinator
+    options: dict[str, Any]
 
 
-async def get_device_information(device: ExtronDevice) -> DeviceInformation:
-    async with device.connection():
-        mac_address = await device.query_mac_address()
-        model_name = await device.query_model_name()
-        firmware_version = await device.run_command("*Q")
-        part_number = await device.query_part_number()
-        ip_address = await device.query_ip_address()
+async def query_device_information(connection: ExtronConnection, device_type: str) -> dict[str, str]:
+    queries = {
+        "mac_address": "\x1b" + "CH",
+        "model_name": "1I",
+        "firmware_version": "*Q",
+        "part_number": "N",
+        "ip_address": "\x1b" + "CI",
+    }
+    if device_type == DEVICE_TYPE_MATRIX_SWITCHER:
+        # The number of inputs and outputs, e.g. V8X4 A8X4
+        queries["matrix_size"] = "I"
+
+    responses = await connection.run_commands(list(queries.values()))
+
+    return dict(zip(queries.keys(), responses, strict=True))
+
+
+def create_device_information(raw_device_information: dict[str, str], device_type: str) -> DeviceInformation:
+    mac_address = raw_device_information["mac_address"]
+    model_name = raw_device_information["model_name"]
+    firmware_version = raw_device_information["firmware_version"]
+    part_number = raw_device_information["part_number"]
+    ip_address = raw_device_information["ip_address"]
 
     device_info = DeviceInfo(
         identifiers={(DOMAIN, format_mac(mac_address))},
@@ -49,27 +101,137 @@ async def get_device_information(device: ExtronDevice) -> DeviceInformation:
         configuration_url=f"http://{ip_address}/",
     )
 
-    return DeviceInformation(mac_address=format_mac(mac_address), model_name=model_name, device_info=device_info)
+    capabilities = CAPABILITY_REGISTRY.lookup(device_type, model_name, part_number)
+    if "matrix_size" in raw_device_information:
+        # What the device reports wins over the registry
+        num_inputs, num_outputs = decode_response("I", raw_device_information["matrix_size"])
+        capabilities = replace(capabilities, num_inputs=num_inputs, num_outputs=num_outputs)
+
+    return DeviceInformation(
+        mac_address=format_mac(mac_address), model_name=model_name, device_info=device_info, capabilities=capabilities
+    )
+
+
+def get_fleet(hass: HomeAssistant) -> Fleet:
+    """Return the fleet shared by all config entries"""
+    if DATA_FLEET not in hass.data:
+        hass.data[DATA_FLEET] = Fleet(POLLING_TICK_INTERVAL_SECONDS, FLEET_MAX_CONCURRENT_SESSIONS)
+
+    return hass.data[DATA_FLEET]
+
+
+def is_push_updates_enabled(entry: ConfigEntry, capabilities: ModelCapabilities) -> bool:
+    return entry.options.get(OPTION_PUSH_UPDATES, False) and capabilities.verbose_mode
+
+
+def create_recorder(hass: HomeAssistant, entry: ConfigEntry) -> TrafficRecorder | None:
+    if not entry.options.get(OPTION_RECORD_TRAFFIC, False):
+        return None
+
+    path = Path(hass.config.path(TRAFFIC_TRACE_DIRECTORY, f"{entry.entry_id}.jsonl"))
+    _LOGGER.info(f"Recording traffic to {path}")
+
+    return TrafficRecorder(path, TRAFFIC_TRACE_MAX_BYTES, secrets=[entry.data[CONF_PASSWORD]])
+
+
+def create_coordinator(
+    hass: HomeAssistant, entry: ConfigEntry, connection: ExtronConnection, device_information: DeviceInformation
+) -> ExtronCoordinator:
+    name = f"Extron {device_information.model_name}"
+    capabilities = device_information.capabilities
+    push_updates = is_push_updates_enabled(entry, capabilities)
+
+    if entry.data[CONF_DEVICE_TYPE] == DeviceType.SURROUND_SOUND_PROCESSOR.value:
+        return SurroundSoundProcessorCoordinator(hass, entry, connection, name, push_updates, capabilities)
+    if entry.data[CONF_DEVICE_TYPE] == DeviceType.HDMI_SWITCHER.value:
+        return HDMISwitcherCoordinator(hass, entry, connection, name, push_updates, capabilities)
+    if entry.data[CONF_DEVICE_TYPE] == DEVICE_TYPE_MATRIX_SWITCHER:
+        return MatrixSwitcherCoordinator(hass, entry, connection, name, push_updates, capabilities)
+
+    raise ValueError(f"Unsupported device type {entry.data[CONF_DEVICE_TYPE]}")
+
+
+async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
+    """Set up the services that aren't tied to a single config entry."""
+    async_setup_services(hass)
+
+    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Extron from a config entry."""
-    # Verify we can connect to the device
-    try:
-        device = ExtronDevice(
-            entry.data["host"], entry.data["port"], entry.data["password"], timeout=EXTRON_DEVICE_TIMEOUT_SECONDS
+    # The connection is kept open until the entry is unloaded
+    device = ExtronDevice(
+        entry.data["host"], entry.data["port"], entry.data["password"], timeout=EXTRON_DEVICE_TIMEOUT_SECONDS
+    )
+    push_updates = entry.options.get(OPTION_PUSH_UPDATES, False)
+    fleet = get_fleet(hass)
+    connection = ExtronConnection(
+        device,
+        verbose_mode=VERBOSE_MODE if push_updates else None,
+        limiter=fleet.semaphore,
+        recorder=create_recorder(hass, entry),
+    )
+    cached_device_information = entry.data.get(CONF_DEVICE_INFORMATION)
+
+    if cached_device_information is None:
+        # First setup, query everything using the same session
+        try:
+            await connection.connect()
+        except AuthenticationError as e:
+            raise ConfigEntryNotReady("Invalid credentials") from e
+        except Exception as e:
+            raise ConfigEntryNotReady("Unable to connect") from e
+
+        try:
+            raw_device_information = await query_device_information(connection, entry.data[CONF_DEVICE_TYPE])
+            # Only device information that can be parsed is cached
+            device_information = create_device_information(raw_device_information, entry.data[CONF_DEVICE_TYPE])
+        except Exception as e:
+            await connection.close()
+            raise ConfigEntryNotReady("Unable to query device information") from e
+
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE_INFORMATION: raw_device_information}
         )
-        await device.connect()
-        await device.disconnect()
-    except AuthenticationError as e:
-        raise ConfigEntryNotReady("Invalid credentials") from e
-    except Exception as e:
-        raise ConfigEntryNotReady("Unable to connect") from e
+    else:
+        try:
+            device_information = create_device_information(cached_device_information, entry.data[CONF_DEVICE_TYPE])
+        except ValueError as e:
+            # Query it again on the next attempt instead of failing the same way on every restart
+            data = {key: value for key, value in entry.data.items() if key != CONF_DEVICE_INFORMATION}
+            hass.config_entries.async_update_entry(entry, data=data)
+            raise ConfigEntryNotReady("Unable to parse the cached device information") from e
+
+        # Entities can be created from the cached device information right away, connect in the background
+        connection.start()
 
     # Store runtime information
-    device_information = await get_device_information(device)
     input_names = entry.options.get(OPTION_INPUT_NAMES, [])
-    entry.runtime_data = ExtronConfigEntryRuntimeData(device, device_information, input_names)
+    coordinator = create_coordinator(hass, entry, connection, device_information)
+
+    if cached_device_information is None:
+        # Fetch the initial device state, all entities share the same coordinator
+        try:
+            await coordinator.async_config_entry_first_refresh()
+        except Exception:
+            await connection.close()
+            raise
+    else:
+        entry.async_create_background_task(
+            hass, async_refresh_in_background(hass, entry, connection, coordinator), "extron_initial_refresh"
+        )
+
+    # Poll periodically, staggered with the other devices
+    entry.async_on_unload(fleet.add(coordinator.async_refresh))
+
+    # Apply changes reported by the device immediately. Models without verbose mode just ignore the request to enable it.
+    if is_push_updates_enabled(entry, device_information.capabilities):
+        entry.async_on_unload(connection.add_notification_listener(coordinator.handle_notification))
+
+    entry.runtime_data = ExtronConfigEntryRuntimeData(
+        connection, device_information, input_names, coordinator, dict(entry.options)
+    )
 
     # Register a listener for option updates
     entry.async_on_unload(entry.add_update_listener(entry_update_listener))
@@ -80,11 +242,41 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_refresh_in_background(
+    hass: HomeAssistant, entry: ConfigEntry, connection: ExtronConnection, coordinator: ExtronCoordinator
+) -> None:
+    await connection.wait_connected()
+    await coordinator.async_refresh()
+
+    # Update the cached device information in case e.g. the firmware has been upgraded
+    try:
+        raw_device_information = await query_device_information(connection, entry.data[CONF_DEVICE_TYPE])
+        device_information = create_device_information(raw_device_information, entry.data[CONF_DEVICE_TYPE])
+    except Exception:
+        _LOGGER.warning("Unable to refresh device information", exc_info=True)
+        return
+
+    if raw_device_information != entry.data.get(CONF_DEVICE_INFORMATION):
+        hass.config_entries.async_update_entry(
+            entry, data={**entry.data, CONF_DEVICE_INFORMATION: raw_device_information}
+        )
+        dr.async_get(hass).async_get_or_create(config_entry_id=entry.entry_id, **device_information.device_info)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
-    return await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
+
+    if unload_ok:
+        runtime_data: ExtronConfigEntryRuntimeData = entry.runtime_data
+        await runtime_data.connection.close()
+
+    return unload_ok
 
 
 async def entry_update_listener(hass: HomeAssistant, config_entry: ConfigEntry):
-    # Reload the entry when options have been changed
-    await hass.config_entries.async_reload(config_entry.entry_id)
+    # Reload the entry when options have been changed. The data is also updated when the cached device information
+    # changes, that doesn't require a reload.
+    runtime_data: ExtronConfigEntryRuntimeData = config_entry.runtime_data
+    if dict(config_entry.options) != runtime_data.options:
+        await hass.config_entries.async_reload(config_entry.entry_id)
@@ -0,0 +1,47 @@
+"""Running the same action on many devices at once."""
+
+import asyncio
+import logging
+import time
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BroadcastResult:
+    success: bool
+    # In seconds, from when the action started rather than from when it was queued
+    latency: float
+    error: str | None = None
+
+
+async def broadcast(
+    actions: dict[str, Callable[[], Awaitable[None]]], timeout: float, max_concurrency: int
+) -> dict[str, BroadcastResult]:
+    """Run the actions in parallel, at most max_concurrency at a time, each with its own timeout.
+
+    An action that fails or times out doesn't affect the others, every action gets a result.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run(action: Callable[[], Awaitable[None]]) -> BroadcastResult:
+        async with semaphore:
+            started_at = time.perf_counter()
+            try:
+                async with asyncio.timeout(timeout):
+                    await action()
+            except TimeoutError:
+                return BroadcastResult(False, time.perf_counter() - started_at, f"Timed out after {timeout} seconds")
+            except Exception as e:
+                return BroadcastResult(False, time.perf_counter() - started_at, str(e) or repr(e))
+
+            return BroadcastResult(True, time.perf_counter() - started_at)
+
+    results = await asyncio.gather(*[run(action) for action in actions.values()])
+    failures = sum(not result.success for result in results)
+    logger.debug(f"Broadcast to {len(actions)} devices, {failures} failed")
+
+    return dict(zip(actions.keys(), results, strict=True))
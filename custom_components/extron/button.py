@@ -2,24 +2,26 @@ from homeassistant.components.button import ButtonDeviceClass, ButtonEntity
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.device_registry import DeviceInfo
-from pyextron import ExtronDevice
 
 from custom_components.extron import DeviceInformation, ExtronConfigEntryRuntimeData
+from custom_components.extron.connection import REBOOT_COMMAND
+from custom_components.extron.coordinator import ExtronCoordinator
 
 
 async def async_setup_entry(_hass: HomeAssistant, entry: ConfigEntry, async_add_entities):
     # Extract stored runtime data from the entry
     runtime_data: ExtronConfigEntryRuntimeData = entry.runtime_data
-    device = runtime_data.device
+    coordinator = runtime_data.coordinator
     device_information = runtime_data.device_information
 
     # Add entities
-    async_add_entities([ExtronRebootButton(device, device_information)])
+    if device_information.capabilities.supports(REBOOT_COMMAND):
+        async_add_entities([ExtronRebootButton(coordinator, device_information)])
 
 
 class ExtronRebootButton(ButtonEntity):
-    def __init__(self, device: ExtronDevice, device_information: DeviceInformation) -> None:
-        self._device = device
+    def __init__(self, coordinator: ExtronCoordinator, device_information: DeviceInformation) -> None:
+        self._coordinator = coordinator
         self._device_information = device_information
 
     _attr_device_class = ButtonDeviceClass.RESTART
@@ -37,5 +39,4 @@ class ExtronRebootButton(ButtonEntity):
         return f"Extron {self._device_information.model_name} reboot button"
 
     async def async_press(self) -> None:
-        async with self._device.connection():
-            await self._device.reboot()
+        await self._coordinator.async_reboot()
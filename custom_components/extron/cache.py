@@ -0,0 +1,132 @@
+"""Short-lived caching of query responses."""
+
+import asyncio
+import re
+import time
+
+from collections.abc import Awaitable, Callable
+
+# Commands that only read state, any other command is assumed to change something on the device
+CACHEABLE_COMMANDS = frozenset(
+    [
+        "$",
+        "!",
+        "I",
+        "V",
+        "Z",
+        "Q",
+        "*Q",
+        "N",
+        "1I",
+        "34I",
+        "\x1b" + "CH",
+        "\x1b" + "CI",
+        "\x1b" + "LOUT",
+        "\x1b" + "IHDCP",
+        "\x1b" + "OHDCP",
+        "\x1b" + "20STAT",
+    ]
+)
+
+# Tie table queries of matrix switchers, one per chunk of outputs
+CACHEABLE_COMMAND_PATTERN = re.compile(r"^\x1b0\*\d+\*1VC$")
+
+
+def is_cacheable(command: str) -> bool:
+    return command in CACHEABLE_COMMANDS or CACHEABLE_COMMAND_PATTERN.match(command) is not None
+
+
+class ResponseCache:
+    """Caches query responses for a short time and coalesces concurrent identical queries.
+
+    Callers asking for a response that is already being fetched wait for the same result instead of sending the
+    query again. Invalidation discards both cached and in-flight responses, so a query sent after a state change
+    never receives a response that was produced before it.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self._ttl = ttl
+        self._entries: dict[str, tuple[float, str]] = {}
+        self._in_flight: dict[str, asyncio.Future[str]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[str]]) -> str:
+        async def fetch_one(_keys: list[str]) -> list[str]:
+            return [await fetch()]
+
+        [value] = await self.get_many([key], fetch_one)
+
+        return value
+
+    async def get_many(self, keys: list[str], fetch: Callable[[list[str]], Awaitable[list[str]]]) -> list[str]:
+        """Like get(), for a batch. The keys that are neither cached nor in flight are fetched with a single call."""
+        now = time.monotonic()
+        values: dict[str, str] = {}
+        in_flight: dict[str, asyncio.Future[str]] = {}
+        missing: list[str] = []
+
+        for key in dict.fromkeys(keys):
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self._ttl:
+                self.hits += 1
+                values[key] = entry[1]
+            elif key in self._in_flight:
+                self.hits += 1
+                in_flight[key] = self._in_flight[key]
+            else:
+                self.misses += 1
+                missing.append(key)
+
+        if missing:
+            # Callers that are cancelled stop waiting, the fetch itself carries on for everyone else waiting for it
+            values.update(zip(missing, await asyncio.shield(self._fetch(missing, fetch)), strict=True))
+
+        for key, future in in_flight.items():
+            values[key] = await asyncio.shield(future)
+
+        return [values[key] for key in keys]
+
+    def _fetch(self, keys: list[str], fetch: Callable[[list[str]], Awaitable[list[str]]]) -> asyncio.Future[list[str]]:
+        generation = self._generation
+        loop = asyncio.get_running_loop()
+        futures: dict[str, asyncio.Future[str]] = {key: loop.create_future() for key in keys}
+        self._in_flight.update(futures)
+        task = asyncio.ensure_future(fetch(keys))
+
+        def resolve(task: asyncio.Future[list[str]]) -> None:
+            for key, future in futures.items():
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+
+            if task.cancelled():
+                for key, future in futures.items():
+                    self._fail(future, ConnectionError(f"Query {key!r} was cancelled"))
+                return
+
+            if task.exception() is not None:
+                for future in futures.values():
+                    self._fail(future, task.exception())
+                return
+
+            now = time.monotonic()
+            for (key, future), value in zip(futures.items(), task.result(), strict=True):
+                future.set_result(value)
+                if generation == self._generation:
+                    self._entries[key] = (now, value)
+
+        task.add_done_callback(resolve)
+
+        return task
+
+    @staticmethod
+    def _fail(future: asyncio.Future[str], exception: BaseException) -> None:
+        future.set_exception(exception)
+        # Mark the exception as retrieved, there may not be anyone else waiting for it
+        future.exception()
+
+    def invalidate(self) -> None:
+        self._generation += 1
+        self._entries.clear()
+        self._in_flight.clear()
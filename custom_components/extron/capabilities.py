@@ -0,0 +1,87 @@
+"""Registry of what each device model supports, loaded from models.json."""
+
+import json
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+MODELS_FILE = Path(__file__).parent / "models.json"
+
+
+@dataclass(frozen=True)
+class ModelCapabilities:
+    device_type: str
+    # None when the number depends on the model and the model is unknown
+    num_inputs: int | None
+    num_outputs: int | None
+    verbose_mode: bool
+    # Fixed queries and other commands the model accepts, commands with arguments are not listed
+    commands: frozenset[str]
+
+    def supports(self, command: str) -> bool:
+        return command in self.commands
+
+
+def parse_command(command: str) -> str:
+    # Escape characters are written as "Esc" in the registry
+    return command.replace("Esc", "\x1b")
+
+
+def create_capabilities(device_type: str, values: dict[str, Any]) -> ModelCapabilities:
+    return ModelCapabilities(
+        device_type=device_type,
+        num_inputs=values["inputs"],
+        num_outputs=values["outputs"],
+        verbose_mode=values["verbose_mode"],
+        commands=frozenset(parse_command(command) for command in values["commands"]),
+    )
+
+
+class CapabilityRegistry:
+    """Looks up capabilities by part number or model name.
+
+    Models inherit the capabilities of their device type and override what differs. Model names are matched by their
+    longest registered prefix, e.g. "SW4" matches "SW4 HD 4K PLUS". Unknown models get the device type defaults.
+    """
+
+    def __init__(self, registry: dict[str, Any]) -> None:
+        self._device_types = registry["device_types"]
+        self._models: dict[str, ModelCapabilities] = {}
+        self._part_numbers: dict[str, ModelCapabilities] = {}
+
+        for model_name, overrides in registry["models"].items():
+            device_type = overrides["device_type"]
+            capabilities = create_capabilities(device_type, {**self._device_types[device_type], **overrides})
+            self._models[model_name.upper()] = capabilities
+            for part_number in overrides.get("part_numbers", []):
+                self._part_numbers[part_number] = capabilities
+
+        # Longest prefixes first
+        self._model_prefixes = sorted(self._models, key=len, reverse=True)
+
+    def find_model(self, model_name: str, part_number: str | None = None) -> ModelCapabilities | None:
+        if part_number in self._part_numbers:
+            return self._part_numbers[part_number]
+
+        model_name = model_name.upper()
+        prefix = next((prefix for prefix in self._model_prefixes if model_name.startswith(prefix)), None)
+
+        return self._models[prefix] if prefix is not None else None
+
+    def lookup(self, device_type: str, model_name: str, part_number: str | None = None) -> ModelCapabilities:
+        capabilities = self.find_model(model_name, part_number)
+
+        # The configured device type wins over a model that happens to share a prefix
+        if capabilities is None or capabilities.device_type != device_type:
+            capabilities = create_capabilities(device_type, self._device_types[device_type])
+
+        return capabilities
+
+
+def load_registry(path: Path = MODELS_FILE) -> CapabilityRegistry:
+    with path.open(encoding="utf-8") as file:
+        return CapabilityRegistry(json.load(file))
+
+
+CAPABILITY_REGISTRY = load_registry()
@@ -0,0 +1,95 @@
+"""Framing and decoding of SIS (Simple Instruction Set) messages."""
+
+import re
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from custom_components.extron.matrix import parse_matrix_size
+
+LINE_DELIMITER = b"\r\n"
+# Longer lines mean the stream is garbage, e.g. something that isn't an Extron device
+MAX_LINE_LENGTH = 4096
+
+VIDEO_TIMING_PATTERN = re.compile(r"^(\d+)\*([\d.]+)\*([\d.]+)\*(\d+)$")
+
+
+class LineFramer:
+    """Splits a byte stream into lines.
+
+    Incomplete lines are buffered until the rest arrives, so it doesn't matter how the device's output is split
+    into reads. All complete lines of a read are returned at once.
+    """
+
+    def __init__(self, max_line_length: int = MAX_LINE_LENGTH) -> None:
+        self._buffer = bytearray()
+        self._max_line_length = max_line_length
+
+    def feed(self, data: bytes) -> list[str]:
+        # Continue the search where the previous read ended, minus a possibly split delimiter
+        search_from = max(0, len(self._buffer) - len(LINE_DELIMITER) + 1)
+        self._buffer += data
+
+        lines: list[str] = []
+        start = 0
+        view = memoryview(self._buffer)
+        while (end := self._buffer.find(LINE_DELIMITER, max(start, search_from))) != -1:
+            lines.append(str(view[start:end], "utf-8", "replace"))
+            start = end + len(LINE_DELIMITER)
+        view.release()
+
+        del self._buffer[:start]
+        if len(self._buffer) > self._max_line_length:
+            raise ValueError(f"Line exceeds {self._max_line_length} bytes")
+
+        return lines
+
+
+@dataclass(frozen=True)
+class VideoTiming:
+    lines: int
+    # In Hz and kHz
+    vertical_frequency: float
+    horizontal_frequency: float
+    pixels: int
+
+
+def parse_video_timing(response: str) -> VideoTiming:
+    """Parse the response to the incoming line count (34I) query, e.g. 2160*30.002735*67.485909*3840"""
+    match = VIDEO_TIMING_PATTERN.match(response)
+    if not match:
+        raise ValueError(f"Unable to parse video timing from {response!r}")
+
+    lines, vertical_frequency, horizontal_frequency, pixels = match.groups()
+
+    return VideoTiming(int(lines), float(vertical_frequency), float(horizontal_frequency), int(pixels))
+
+
+def parse_flag(response: str) -> bool:
+    return response == "1"
+
+
+# Decoders of the responses to fixed queries
+RESPONSE_DECODERS: dict[str, Callable[[str], Any]] = {
+    "$": int,
+    "!": int,
+    "Z": parse_flag,
+    "V": int,
+    "I": parse_matrix_size,
+    "34I": parse_video_timing,
+    "\x1b" + "20STAT": int,
+    "\x1b" + "LOUT": int,
+    "\x1b" + "IHDCP": int,
+    "\x1b" + "OHDCP": int,
+}
+
+
+def decode_response(command: str, response: str) -> Any:
+    """Convert the response to a query into a typed value, raises ValueError if the response is malformed"""
+    try:
+        decoder = RESPONSE_DECODERS[command]
+    except KeyError:
+        raise ValueError(f"No decoder for command {command!r}") from None
+
+    return decoder(response)
@@ -6,24 +6,34 @@ from typing import Any
 
 import voluptuous as vol
 
-from homeassistant.config_entries import ConfigEntry, ConfigFlow, OptionsFlow
+from homeassistant.config_entries import SOURCE_INTEGRATION_DISCOVERY, ConfigEntry, ConfigFlow, OptionsFlow
 from homeassistant.helpers.device_registry import format_mac
 from homeassistant.helpers.selector import selector
-from pyextron import AuthenticationError, DeviceType, ExtronDevice
+from pyextron import AuthenticationError, DeviceType
 
+from .connection import ResponseError
 from .const import (
     CONF_DEVICE_TYPE,
     CONF_HOST,
     CONF_PASSWORD,
     CONF_PORT,
+    DEVICE_TYPE_MATRIX_SWITCHER,
     DOMAIN,
     EXTRON_DEVICE_TIMEOUT_SECONDS,
     OPTION_INPUT_NAMES,
+    OPTION_PUSH_UPDATES,
+    OPTION_RECORD_TRAFFIC,
+    OPTION_UNAVAILABLE_AFTER,
+    UNAVAILABLE_AFTER_SECONDS,
 )
+from .discovery import DiscoveredDevice, discover_devices, identify_device, parse_addresses
 
 _LOGGER = logging.getLogger(__name__)
 
-STEP_USER_DATA_SCHEMA = vol.Schema(
+CONF_HOSTS = "hosts"
+CONF_DEVICES = "devices"
+
+STEP_MANUAL_DATA_SCHEMA = vol.Schema(
     {
         vol.Required(CONF_HOST): str,
         vol.Required(CONF_PORT, default=23): int,
@@ -33,6 +43,7 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
                 "select": {
                     "options": [
                         {"label": "HDMI Switcher", "value": DeviceType.HDMI_SWITCHER.value},
+                        {"label": "Matrix Switcher", "value": DEVICE_TYPE_MATRIX_SWITCHER},
                         {"label": "Surround Sound Processor", "value": DeviceType.SURROUND_SOUND_PROCESSOR.value},
                     ]
                 }
@@ -42,44 +53,152 @@ STEP_USER_DATA_SCHEMA = vol.Schema(
 )
 
 
+STEP_DISCOVER_DATA_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_HOSTS): str,
+        vol.Required(CONF_PORT, default=23): int,
+        vol.Required(CONF_PASSWORD): str,
+    }
+)
+
+
 class ExtronConfigFlow(ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Extron."""
 
     VERSION = 1
 
+    def __init__(self) -> None:
+        self._discovery_input: dict[str, Any] = {}
+        self._discovered_devices: dict[str, DiscoveredDevice] = {}
+        self._discovered_entry_data: dict[str, Any] = {}
+
     async def async_step_user(self, user_input: dict[str, Any] | None = None):
         """Handle the initial step."""
+        return self.async_show_menu(step_id="user", menu_options=["manual", "discover"])
+
+    async def async_step_manual(self, user_input: dict[str, Any] | None = None):
+        """Add a single device by its address"""
         errors: dict[str, str] = {}
         if user_input is not None:
             try:
-                # Try to connect to the device
-                extron_device = ExtronDevice(
-                    user_input["host"],
-                    user_input["port"],
-                    user_input["password"],
-                    timeout=EXTRON_DEVICE_TIMEOUT_SECONDS,
+                # Try to connect to the device, the model name and MAC address are queried in the same session
+                device = await identify_device(
+                    user_input[CONF_HOST],
+                    user_input[CONF_PORT],
+                    user_input[CONF_PASSWORD],
+                    EXTRON_DEVICE_TIMEOUT_SECONDS,
                 )
-                await extron_device.connect()
-
-                # Make a title for the entry
-                model_name = await extron_device.query_model_name()
-                title = f"Extron {model_name}"
 
                 # Make a unique ID for the entry, prevent adding the same device twice
-                unique_id = format_mac(await extron_device.query_mac_address())
-                await self.async_set_unique_id(unique_id)
+                await self.async_set_unique_id(format_mac(device.mac_address))
                 self._abort_if_unique_id_configured()
-
-                # Disconnect, we'll connect again later, this was just for validation
-                await extron_device.disconnect()
             except AuthenticationError:
                 errors["base"] = "invalid_auth"
             except (BrokenPipeError, ConnectionError, OSError):  # all technically OSError
                 errors["base"] = "cannot_connect"
+            except ResponseError:
+                errors["base"] = "unknown"
+            else:
+                return self.async_create_entry(title=f"Extron {device.model_name}", data=user_input)
+
+        return self.async_show_form(step_id="manual", data_schema=STEP_MANUAL_DATA_SCHEMA, errors=errors)
+
+    async def async_step_discover(self, user_input: dict[str, Any] | None = None):
+        """Probe a list of addresses and networks for devices that accept the password"""
+        errors: dict[str, str] = {}
+        if user_input is not None:
+            try:
+                hosts = parse_addresses(user_input[CONF_HOSTS])
+            except ValueError:
+                errors[CONF_HOSTS] = "invalid_hosts"
             else:
-                return self.async_create_entry(title=title, data=user_input)
+                devices, auth_failures = await discover_devices(hosts, user_input[CONF_PORT], user_input[CONF_PASSWORD])
+
+                configured = self._async_current_ids()
+                self._discovery_input = user_input
+                self._discovered_devices = {
+                    format_mac(device.mac_address): device
+                    for device in devices
+                    if format_mac(device.mac_address) not in configured and device.device_type is not None
+                }
+
+                if self._discovered_devices:
+                    return await self.async_step_select_devices()
+
+                errors["base"] = "invalid_auth" if auth_failures else "no_devices_found"
+
+        return self.async_show_form(step_id="discover", data_schema=STEP_DISCOVER_DATA_SCHEMA, errors=errors)
+
+    async def async_step_select_devices(self, user_input: dict[str, Any] | None = None):
+        """Choose which of the discovered devices to add"""
+        if user_input is not None and user_input[CONF_DEVICES]:
+            first, *others = [self._discovered_devices[unique_id] for unique_id in user_input[CONF_DEVICES]]
 
-        return self.async_show_form(step_id="user", data_schema=STEP_USER_DATA_SCHEMA, errors=errors)
+            # A flow creates one entry, the other devices are offered as discovered devices to be confirmed one by one
+            for device in others:
+                self.hass.async_create_task(
+                    self.hass.config_entries.flow.async_init(
+                        DOMAIN, context={"source": SOURCE_INTEGRATION_DISCOVERY}, data=self._create_entry_data(device)
+                    )
+                )
+
+            return await self._async_create_discovered_entry(self._create_entry_data(first))
+
+        options = [
+            {"label": f"{device.model_name} ({device.host})", "value": unique_id}
+            for unique_id, device in sorted(self._discovered_devices.items(), key=lambda item: item[1].host)
+        ]
+
+        return self.async_show_form(
+            step_id="select_devices",
+            data_schema=vol.Schema(
+                {
+                    vol.Required(CONF_DEVICES, default=[option["value"] for option in options]): selector(
+                        {"select": {"options": options, "multiple": True}}
+                    ),
+                }
+            ),
+        )
+
+    async def async_step_integration_discovery(self, discovery_info: dict[str, Any]):
+        """Offer a device found by discovery, it's only added once the user confirms it"""
+        await self.async_set_unique_id(discovery_info["unique_id"])
+        self._abort_if_unique_id_configured()
+
+        self._discovered_entry_data = discovery_info
+        self.context["title_placeholders"] = {"name": discovery_info["title"]}
+
+        return await self.async_step_discovery_confirm()
+
+    async def async_step_discovery_confirm(self, user_input: dict[str, Any] | None = None):
+        """Confirm adding a discovered device"""
+        if user_input is not None:
+            return await self._async_create_discovered_entry(self._discovered_entry_data)
+
+        return self.async_show_form(
+            step_id="discovery_confirm",
+            description_placeholders={
+                "name": self._discovered_entry_data["title"],
+                "host": self._discovered_entry_data[CONF_HOST],
+            },
+        )
+
+    async def _async_create_discovered_entry(self, entry_data: dict[str, Any]):
+        data = dict(entry_data)
+        await self.async_set_unique_id(data.pop("unique_id"))
+        self._abort_if_unique_id_configured()
+
+        return self.async_create_entry(title=data.pop("title"), data=data)
+
+    def _create_entry_data(self, device: DiscoveredDevice) -> dict[str, Any]:
+        return {
+            "unique_id": format_mac(device.mac_address),
+            "title": f"Extron {device.model_name}",
+            CONF_HOST: device.host,
+            CONF_PORT: self._discovery_input[CONF_PORT],
+            CONF_PASSWORD: self._discovery_input[CONF_PASSWORD],
+            CONF_DEVICE_TYPE: device.device_type,
+        }
 
     @staticmethod
     def async_get_options_flow(config_entry: ConfigEntry) -> OptionsFlow:
@@ -102,6 +221,16 @@ class ExtronOptionsFlowHandler(OptionsFlow):
                     vol.Optional(
                         OPTION_INPUT_NAMES, default=self.config_entry.options.get(OPTION_INPUT_NAMES)
                     ): selector({"text": {"multiple": True}}),
+                    vol.Optional(
+                        OPTION_PUSH_UPDATES, default=self.config_entry.options.get(OPTION_PUSH_UPDATES, False)
+                    ): bool,
+                    vol.Optional(
+                        OPTION_UNAVAILABLE_AFTER,
+                        default=self.config_entry.options.get(OPTION_UNAVAILABLE_AFTER, UNAVAILABLE_AFTER_SECONDS),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Optional(
+                        OPTION_RECORD_TRAFFIC, default=self.config_entry.options.get(OPTION_RECORD_TRAFFIC, False)
+                    ): bool,
                 }
             ),
         )
@@ -0,0 +1,586 @@
+"""Persistent connection handling for Extron devices."""
+
+import asyncio
+import contextlib
+import logging
+import re
+import time
+
+from collections import deque
+from collections.abc import Callable
+from typing import Any
+
+from pyextron import AuthenticationError, ExtronDevice
+
+from custom_components.extron.cache import ResponseCache, is_cacheable
+from custom_components.extron.codec import LineFramer
+from custom_components.extron.const import (
+    CIRCUIT_BREAKER_PROBE_BACKOFF_INITIAL_SECONDS,
+    CIRCUIT_BREAKER_PROBE_BACKOFF_MAX_SECONDS,
+    CIRCUIT_BREAKER_THRESHOLD,
+    EXTRON_DEVICE_TIMEOUT_SECONDS,
+    KEEPALIVE_INTERVAL_SECONDS,
+    MAX_BACKGROUND_COMMANDS_IN_FLIGHT,
+    REBOOT_RECONNECT_INTERVAL_SECONDS,
+    REBOOT_TIMEOUT_SECONDS,
+    RECONNECT_BACKOFF_INITIAL_SECONDS,
+    RECONNECT_BACKOFF_MAX_SECONDS,
+    RESPONSE_CACHE_TTL_SECONDS,
+)
+from custom_components.extron.metrics import ConnectionMetrics
+from custom_components.extron.notification import Notification, expects_tagged_response, parse_notification
+from custom_components.extron.recorder import TrafficRecorder
+
+logger = logging.getLogger(__name__)
+
+ERROR_RESPONSE_PATTERN = re.compile(r"^E\d{2}$")
+
+READ_BUFFER_SIZE = 65536
+
+REBOOT_COMMAND = "\x1b" + "1BOOT"
+
+NotificationListener = Callable[[Notification], None]
+
+
+class ResponseError(Exception):
+    pass
+
+
+class CircuitOpenError(ConnectionError):
+    pass
+
+
+class NotConnectedError(ConnectionError):
+    pass
+
+
+def check_response(command: str, response: str) -> str:
+    if ERROR_RESPONSE_PATTERN.match(response):
+        raise ResponseError(f"Command {command!r} failed with error code {response}")
+
+    return response
+
+
+def calculate_backoff(attempt: int, initial: float, maximum: float) -> float:
+    return min(maximum, initial * 2**attempt)
+
+
+class CircuitBreaker:
+    """Counts consecutive failures of a device.
+
+    Once the threshold is reached the circuit is open and commands should fail immediately, instead of each of them
+    waiting for the full timeout. A single probe may then be sent after a backoff that doubles with every failed
+    probe, and the first success closes the circuit again.
+    """
+
+    def __init__(self, threshold: int, probe_backoff_initial: float, probe_backoff_max: float) -> None:
+        self._threshold = threshold
+        self._probe_backoff_initial = probe_backoff_initial
+        self._probe_backoff_max = probe_backoff_max
+        self.consecutive_failures = 0
+
+    @property
+    def is_open(self) -> bool:
+        return self.consecutive_failures >= self._threshold
+
+    @property
+    def probe_delay(self) -> float:
+        failed_probes = max(0, self.consecutive_failures - self._threshold)
+
+        return calculate_backoff(failed_probes, self._probe_backoff_initial, self._probe_backoff_max)
+
+    def record_success(self) -> bool:
+        """Return whether this closed the circuit"""
+        was_open = self.is_open
+        self.consecutive_failures = 0
+
+        return was_open
+
+    def record_failure(self) -> bool:
+        """Return whether this opened the circuit"""
+        self.consecutive_failures += 1
+
+        return self.consecutive_failures == self._threshold
+
+
+class ExtronConnection:
+    """A long-lived connection to an Extron device.
+
+    Commands are written one batch at a time using a lock. The connection is kept open by querying the device when it has been
+    idle, and is re-established in the background with exponential backoff when it breaks. run_command() behaves
+    like ExtronDevice.run_command(), so the pyextron device classes can be used on top of the connection.
+
+    pyextron takes care of the login, after which all incoming lines are read by a single reader task. Lines are
+    matched to commands in the order they were sent, while unsolicited messages (verbose mode) are passed to the
+    registered notification listeners.
+
+    Responses to queries are cached briefly, so identical queries from different callers only reach the device
+    once. Any other command or notification invalidates the cache.
+
+    Connection attempts, failures and the round-trip time of every command are recorded in the metrics.
+
+    Interactive commands are written right away, while background queries (polling) wait in a queue and only a few
+    of them are in flight at a time. A user action therefore never waits behind a whole poll cycle. A query that is
+    already queued isn't queued again, the callers share its response.
+
+    The optional limiter is shared with other connections. It is held while logging in and while sending background
+    batches, so that many devices don't all connect or poll at the same moment.
+
+    A device that keeps timing out trips the circuit breaker. Commands then fail immediately, and a single cheap
+    query probes the device with exponential backoff until it answers again.
+
+    Reboots are expected: the connection is dropped right after the reboot command and re-established at a short
+    fixed interval, without counting as a failure. The time until the device is back is recorded in the metrics.
+
+    An optional recorder receives every command, response and connection event, for replaying the traffic offline.
+    """
+
+    def __init__(
+        self,
+        device: ExtronDevice,
+        timeout: float = EXTRON_DEVICE_TIMEOUT_SECONDS,
+        keepalive_interval: float = KEEPALIVE_INTERVAL_SECONDS,
+        verbose_mode: int | None = None,
+        limiter: asyncio.Semaphore | None = None,
+        recorder: TrafficRecorder | None = None,
+    ) -> None:
+        self._device = device
+        self._timeout = timeout
+        self._keepalive_interval = keepalive_interval
+        self._verbose_mode = verbose_mode
+        # The limiter must always be acquired before the lock, never while holding it
+        self._limiter = limiter or contextlib.nullcontext()
+        self._lock = asyncio.Lock()
+        self._recorder = recorder
+        self._connected = False
+        self._connected_event = asyncio.Event()
+        self._closed = True
+        self._last_activity = 0.0
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+        # Written commands waiting for a response: command, future, time sent, whether it's a background command
+        self._pending: deque[tuple[str, asyncio.Future[str], float, bool]] = deque()
+        self._background_queue: dict[str, asyncio.Future[str]] = {}
+        self._background_in_flight = 0
+        self._notification_listeners: list[NotificationListener] = []
+        self._reader_task: asyncio.Task | None = None
+        self._keepalive_task: asyncio.Task | None = None
+        self._reconnect_task: asyncio.Task | None = None
+        self._probe_task: asyncio.Task | None = None
+        self._rebooting_since: float | None = None
+        self.circuit_breaker = CircuitBreaker(
+            CIRCUIT_BREAKER_THRESHOLD,
+            CIRCUIT_BREAKER_PROBE_BACKOFF_INITIAL_SECONDS,
+            CIRCUIT_BREAKER_PROBE_BACKOFF_MAX_SECONDS,
+        )
+        self.response_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS)
+        self.metrics = ConnectionMetrics()
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    @property
+    def is_rebooting(self) -> bool:
+        # A device that doesn't come back in time is treated as failed
+        return self._rebooting_since is not None and time.monotonic() - self._rebooting_since < REBOOT_TIMEOUT_SECONDS
+
+    def add_notification_listener(self, listener: NotificationListener) -> Callable[[], None]:
+        self._notification_listeners.append(listener)
+
+        def remove_listener() -> None:
+            self._notification_listeners.remove(listener)
+
+        return remove_listener
+
+    async def connect(self) -> None:
+        async with self._limiter, self._lock:
+            await self._open()
+
+        self._closed = False
+        self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+
+    def start(self) -> None:
+        """Connect in the background, retrying with backoff until the device can be reached"""
+        self._closed = False
+        self._keepalive_task = asyncio.create_task(self._keepalive_loop())
+        self._reconnect_task = asyncio.create_task(self._reconnect_loop(immediately=True))
+
+    async def wait_connected(self) -> None:
+        await self._connected_event.wait()
+
+    async def close(self) -> None:
+        self._closed = True
+
+        for task in (self._keepalive_task, self._reconnect_task, self._probe_task):
+            if task is not None:
+                task.cancel()
+
+        async with self._lock:
+            self._disconnect(ConnectionError("Connection closed"))
+
+        if self._recorder is not None:
+            self._record("close")
+            await self._recorder.close()
+
+    async def reboot(self) -> None:
+        """Reboot the device and reconnect as soon as it's back"""
+        # The device may close the connection right after acknowledging the command
+        self._rebooting_since = time.monotonic()
+
+        try:
+            await self.run_command(REBOOT_COMMAND)
+        except (CircuitOpenError, NotConnectedError, ResponseError):
+            # The command never reached the device, or the device refused it
+            self._rebooting_since = None
+            raise
+        except OSError as e:
+            # Some devices drop the connection before acknowledging the command, they're rebooting all the same
+            logger.debug(f"Connection lost while rebooting: {e!r}")
+
+        self.metrics.reboots += 1
+        self._record("reboot")
+        self._handle_connection_lost(ConnectionError("Device is rebooting"))
+
+    async def run_command(self, command: str) -> str:
+        if is_cacheable(command):
+            return await self.response_cache.get(command, lambda: self._run_command(command))
+
+        self.response_cache.invalidate()
+
+        return await self._run_command(command)
+
+    async def run_commands(self, commands: list[str], background: bool = False) -> list[str]:
+        """Send multiple commands back-to-back and return their responses in the same order.
+
+        The whole batch costs roughly one round trip, since the device receives every command before the first
+        response has been read. Background batches (polling) wait for the limiter first. In a batch of queries, only
+        the ones that aren't cached are sent.
+        """
+        if all(is_cacheable(command) for command in commands):
+            return await self.response_cache.get_many(commands, lambda queries: self._send_batch(queries, background))
+
+        self.response_cache.invalidate()
+
+        return await self._send_batch(commands, background)
+
+    async def _send_batch(self, commands: list[str], background: bool) -> list[str]:
+        if background:
+            async with self._limiter:
+                responses = await self._send(commands, background=True)
+        else:
+            responses = await self._send(commands)
+
+        for command, response in zip(commands, responses, strict=True):
+            check_response(command, response)
+
+        return responses
+
+    async def _run_command(self, command: str) -> str:
+        [response] = await self._send([command])
+
+        return check_response(command, response)
+
+    async def _open(self) -> None:
+        try:
+            await asyncio.wait_for(self._device.connect(), timeout=self._timeout)
+        except AuthenticationError:
+            self.metrics.auth_failures += 1
+            self._record("auth_failure")
+            self._close_device_streams()
+            raise
+        except Exception as e:
+            self.metrics.connect_failures += 1
+            self._record("connect_failure", error=repr(e))
+            self._close_device_streams()
+            raise
+
+        self.metrics.connects += 1
+        self._record("connect")
+
+        self._reader = self._device._reader
+        self._writer = self._device._writer
+        self._connected = True
+        self._connected_event.set()
+        self._last_activity = time.monotonic()
+        self._reader_task = asyncio.create_task(self._read_loop(self._reader))
+
+        if self._verbose_mode is not None:
+            await self._wait(self._write(["\x1b" + f"{self._verbose_mode}CV"]))
+
+    async def _send(self, commands: list[str], probe: bool = False, background: bool = False) -> list[str]:
+        if self._recorder is None:
+            return await self._send_commands(commands, probe, background)
+
+        # Recorded when done, the request was made latency_ms before the event's time
+        started_at = time.monotonic()
+        error = None
+        try:
+            return await self._send_commands(commands, probe, background)
+        except Exception as e:
+            error = repr(e)
+            raise
+        finally:
+            latency_ms = round((time.monotonic() - started_at) * 1000, 3)
+            self._record("request", commands=commands, background=background, latency_ms=latency_ms, error=error)
+
+    async def _send_commands(self, commands: list[str], probe: bool, background: bool) -> list[str]:
+        if self.circuit_breaker.is_open and not probe:
+            raise CircuitOpenError("The device isn't responding, waiting for it to recover")
+
+        if background:
+            if not self._connected:
+                raise NotConnectedError("Not connected to the device, waiting for reconnection")
+
+            futures = [self._enqueue_background(command) for command in commands]
+            self._write_background()
+        else:
+            # The lock only covers writing, responses are awaited outside it so that concurrent callers can pipeline
+            # their commands. The reader task hands out responses in the order the commands were written.
+            async with self._lock:
+                if not self._connected:
+                    raise NotConnectedError("Not connected to the device, waiting for reconnection")
+
+                futures = self._write(commands)
+
+                try:
+                    await self._writer.drain()
+                except OSError as e:
+                    self._handle_connection_lost(e)
+                    raise
+
+        responses = await self._wait(futures)
+
+        if self.circuit_breaker.record_success():
+            logger.info("Device is responding again")
+
+        return responses
+
+    def _record_failure(self) -> None:
+        # Called once per lost connection, however many commands were waiting for a response
+        if self.circuit_breaker.record_failure():
+            self.metrics.circuit_breaker_trips += 1
+            logger.warning(
+                f"Device failed to respond {self.circuit_breaker.consecutive_failures} times in a row, "
+                f"pausing commands until it recovers"
+            )
+            if self._probe_task is None or self._probe_task.done():
+                self._probe_task = asyncio.create_task(self._probe_loop())
+
+    async def _probe_loop(self) -> None:
+        while not self._closed and self.circuit_breaker.is_open:
+            await asyncio.sleep(self.circuit_breaker.probe_delay)
+            await self._connected_event.wait()
+
+            try:
+                await self._send(["Q"], probe=True)
+            except Exception as e:
+                logger.debug(f"Probe failed, retrying in {self.circuit_breaker.probe_delay} seconds: {e!r}")
+
+    def _write(self, commands: list[str]) -> list[asyncio.Future[str]]:
+        """Queue commands for sending. The caller must hold the lock."""
+        loop = asyncio.get_running_loop()
+        futures: list[asyncio.Future[str]] = []
+        sent_at = time.monotonic()
+
+        for command in commands:
+            future = loop.create_future()
+            self._pending.append((command, future, sent_at, False))
+            futures.append(future)
+
+        self._writer.write("".join(f"{command}\n" for command in commands).encode())
+
+        return futures
+
+    def _enqueue_background(self, command: str) -> asyncio.Future[str]:
+        future = self._background_queue.get(command)
+
+        # The same query queued again (e.g. by an overdue poll) would get the same answer
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._background_queue[command] = future
+
+        return future
+
+    def _write_background(self) -> None:
+        """Write queued background commands while there's room for them. Called whenever a response arrives."""
+        lines = []
+        sent_at = time.monotonic()
+
+        while self._background_queue and self._background_in_flight < MAX_BACKGROUND_COMMANDS_IN_FLIGHT:
+            command = next(iter(self._background_queue))
+            future = self._background_queue.pop(command)
+            if future.done():
+                continue
+
+            self._pending.append((command, future, sent_at, True))
+            self._background_in_flight += 1
+            lines.append(f"{command}\n")
+
+        # A single synchronous write, so the commands can't be interleaved with a batch being written under the lock
+        if lines:
+            self._writer.write("".join(lines).encode())
+
+    async def _wait(self, futures: list[asyncio.Future[str]]) -> list[str]:
+        try:
+            # Queued background queries are shared, a caller that's cancelled must not cancel them for the others
+            responses = await asyncio.wait_for(
+                asyncio.gather(*[asyncio.shield(future) for future in futures]), timeout=self._timeout
+            )
+        except TimeoutError as e:
+            # Timeouts and broken pipes leave the connection in an unknown state
+            self.metrics.timeouts += 1
+            self._record("timeout")
+            self._handle_connection_lost(e)
+            raise
+        except OSError as e:
+            self._handle_connection_lost(e)
+            raise
+
+        self._last_activity = time.monotonic()
+
+        return responses
+
+    async def _read_loop(self, reader: asyncio.StreamReader) -> None:
+        framer = LineFramer()
+
+        try:
+            while True:
+                # Pipelined responses tend to arrive together, handle everything that has been received at once
+                data = await reader.read(READ_BUFFER_SIZE)
+                if not data:
+                    raise ConnectionError("Connection closed by the device")
+
+                for line in framer.feed(data):
+                    self._handle_line(line.strip())
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if reader is self._reader:
+                self._handle_connection_lost(e)
+
+    def _handle_line(self, line: str) -> None:
+        if not line:
+            return
+
+        notification = parse_notification(line)
+
+        # Tagged messages are responses only if the command we're waiting for changes a value, otherwise they're
+        # unsolicited notifications that happened to arrive while a query was in flight
+        if self._pending and (notification is None or expects_tagged_response(self._pending[0][0])):
+            command, future, sent_at, background = self._pending.popleft()
+            round_trip_time = time.monotonic() - sent_at
+            self.metrics.record_command(command, round_trip_time)
+            self._record("response", command=command, response=line, rtt_ms=round(round_trip_time * 1000, 3))
+            if ERROR_RESPONSE_PATTERN.match(line):
+                self.metrics.error_responses += 1
+            if not future.done():
+                future.set_result(line)
+
+            if background:
+                self._background_in_flight -= 1
+                self._write_background()
+
+        if notification is not None:
+            self.metrics.notifications += 1
+            self._record("notification", line=line)
+            self.response_cache.invalidate()
+
+            for listener in list(self._notification_listeners):
+                try:
+                    listener(notification)
+                except Exception:
+                    logger.exception(f"Notification listener failed to handle {notification}")
+
+    def _record(self, event: str, **fields: Any) -> None:
+        if self._recorder is not None:
+            self._recorder.record(event, **fields)
+
+    def _disconnect(self, reason: Exception) -> None:
+        self._connected = False
+        self._connected_event.clear()
+
+        if self._reader_task is not None and self._reader_task is not asyncio.current_task():
+            self._reader_task.cancel()
+        self._reader_task = None
+
+        while self._pending:
+            _, future, _, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(reason)
+
+        for future in self._background_queue.values():
+            if not future.done():
+                future.set_exception(reason)
+        self._background_queue.clear()
+        self._background_in_flight = 0
+
+        self._close_device_streams()
+        self._reader = None
+        self._writer = None
+
+    def _close_device_streams(self) -> None:
+        try:
+            if self._device._writer is not None:
+                self._device._writer.close()
+        except Exception:
+            logger.debug("Ignoring error while closing connection", exc_info=True)
+
+    def _handle_connection_lost(self, reason: Exception) -> None:
+        if not self._connected:
+            return
+
+        self._disconnect(ConnectionError(f"Connection lost: {reason}"))
+        self._record("connection_lost", reason=repr(reason))
+
+        if self.is_rebooting:
+            logger.info("Device is rebooting, reconnecting once it's back")
+        else:
+            self.metrics.connection_losses += 1
+            self._record_failure()
+            logger.warning(f"Connection to device lost ({reason!r}), reconnecting")
+
+        if not self._closed and (self._reconnect_task is None or self._reconnect_task.done()):
+            self._reconnect_task = asyncio.create_task(self._reconnect_loop())
+
+    async def _reconnect_loop(self, immediately: bool = False) -> None:
+        attempt = 0
+
+        while not self._closed:
+            if attempt > 0 or not immediately:
+                await asyncio.sleep(self._get_reconnect_delay(attempt))
+
+            try:
+                async with self._limiter, self._lock:
+                    await self._open()
+            except Exception as e:
+                attempt += 1
+                if attempt == 1 and not self.is_rebooting:
+                    logger.warning(f"Unable to connect to device, retrying in the background: {e!r}")
+                else:
+                    logger.debug(f"Connection attempt {attempt} failed: {e!r}")
+            else:
+                if self.is_rebooting:
+                    self.metrics.reboot_recovery_time = time.monotonic() - self._rebooting_since
+                    logger.info(f"Device is back {self.metrics.reboot_recovery_time:.1f} seconds after rebooting")
+                else:
+                    if not immediately:
+                        self.metrics.reconnects += 1
+                    logger.info("Connected to device")
+                self._rebooting_since = None
+                return
+
+    def _get_reconnect_delay(self, attempt: int) -> float:
+        if self.is_rebooting:
+            return REBOOT_RECONNECT_INTERVAL_SECONDS
+
+        return calculate_backoff(attempt, RECONNECT_BACKOFF_INITIAL_SECONDS, RECONNECT_BACKOFF_MAX_SECONDS)
+
+    async def _keepalive_loop(self) -> None:
+        while not self._closed:
+            await asyncio.sleep(self._keepalive_interval)
+
+            if self._connected and time.monotonic() - self._last_activity >= self._keepalive_interval:
+                try:
+                    await self._run_command("Q")
+                except Exception as e:
+                    logger.debug(f"Keepalive query failed: {e}")
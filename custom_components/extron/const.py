@@ -6,7 +6,70 @@ CONF_HOST = "host"
 CONF_PORT = "port"
 CONF_PASSWORD = "password"
 CONF_DEVICE_TYPE = "device_type"
+CONF_DEVICE_INFORMATION = "device_information"
+
+# pyextron doesn't know about matrix switchers, the other device types are pyextron.DeviceType values
+DEVICE_TYPE_MATRIX_SWITCHER = "matrix_switcher"
 
 OPTION_INPUT_NAMES = "input_names"
+OPTION_PUSH_UPDATES = "push_updates"
+OPTION_UNAVAILABLE_AFTER = "unavailable_after"
+OPTION_RECORD_TRAFFIC = "record_traffic"
 
 EXTRON_DEVICE_TIMEOUT_SECONDS = 10
+
+# Idle connections are closed by the device after a while, query it periodically to keep them open
+KEEPALIVE_INTERVAL_SECONDS = 30
+RECONNECT_BACKOFF_INITIAL_SECONDS = 1
+RECONNECT_BACKOFF_MAX_SECONDS = 60
+
+# A rebooting device is reconnected to at this fixed interval, for at most the timeout, instead of backing off
+REBOOT_RECONNECT_INTERVAL_SECONDS = 1
+REBOOT_TIMEOUT_SECONDS = 300
+
+# After this many consecutive timeouts or connection losses commands fail immediately, until a probe succeeds
+CIRCUIT_BREAKER_THRESHOLD = 3
+CIRCUIT_BREAKER_PROBE_BACKOFF_INITIAL_SECONDS = 5
+CIRCUIT_BREAKER_PROBE_BACKOFF_MAX_SECONDS = 300
+
+# Entities keep showing the last known state while the device has been failing for less than this
+UNAVAILABLE_AFTER_SECONDS = 60
+
+# Each query has its own polling interval, the fleet only checks this often whether any of them are due
+POLLING_TICK_INTERVAL_SECONDS = 10
+# Background queries written to a device before the earlier ones have been answered. Interactive commands are
+# written immediately, so they only ever wait behind this many queries.
+MAX_BACKGROUND_COMMANDS_IN_FLIGHT = 4
+
+# Devices connecting or polling at the same time, across all config entries
+FLEET_MAX_CONCURRENT_SESSIONS = 8
+DATA_FLEET = "extron_fleet"
+
+# Traffic traces are written to this directory in the configuration directory, one per entry. Each trace is rotated
+# at the maximum size, keeping one older file.
+TRAFFIC_TRACE_DIRECTORY = "extron_traces"
+TRAFFIC_TRACE_MAX_BYTES = 10 * 1024 * 1024
+
+# Verbose mode makes the device report changes without being asked
+VERBOSE_MODE = 1
+
+# Identical queries within this period are answered from a cache instead of the device
+RESPONSE_CACHE_TTL_SECONDS = 1
+
+# Volume steps arriving within this period are sent as one command
+VOLUME_DEBOUNCE_SECONDS = 0.3
+VOLUME_RAMP_MAX_COMMANDS_PER_SECOND = 10
+
+# Scenes broadcast to many devices are applied to this many devices at a time, each within the timeout
+BROADCAST_MAX_CONCURRENCY = 32
+BROADCAST_TIMEOUT_SECONDS = 5
+
+SERVICE_RAMP_VOLUME = "ramp_volume"
+SERVICE_APPLY_SCENE = "apply_scene"
+SERVICE_RECALL_PRESET = "recall_preset"
+SERVICE_BROADCAST_SCENE = "broadcast_scene"
+ATTR_DURATION = "duration"
+ATTR_TIES = "ties"
+ATTR_PRESET = "preset"
+ATTR_TIMEOUT = "timeout"
+ATTR_MAX_CONCURRENCY = "max_concurrency"
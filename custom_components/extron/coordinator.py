@@ -0,0 +1,418 @@
+"""Data update coordinators for Extron devices."""
+
+import logging
+import time
+
+from abc import abstractmethod
+from array import array
+from dataclasses import dataclass, fields, replace
+from datetime import datetime
+from typing import Any, NamedTuple, TypeVar
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+
+from custom_components.extron.capabilities import ModelCapabilities
+from custom_components.extron.codec import VideoTiming, decode_response
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.const import OPTION_UNAVAILABLE_AFTER, UNAVAILABLE_AFTER_SECONDS
+from custom_components.extron.matrix import diff_ties, parse_tie_table, tie_command, tie_table_queries
+from custom_components.extron.notification import Notification, parse_notification
+from custom_components.extron.scheduler import AdaptivePollingScheduler, PollingPolicy
+
+logger = logging.getLogger(__name__)
+
+# Values that change often, e.g. the selected input, and values that rarely change
+FAST_POLLING_POLICY = PollingPolicy(interval=30, max_interval=120)
+SLOW_POLLING_POLICY = PollingPolicy(interval=60, max_interval=600)
+STATIC_POLLING_POLICY = PollingPolicy(interval=300, max_interval=1800)
+
+# With push updates enabled polling is only needed to catch missed notifications
+RECONCILIATION_POLLING_POLICY = PollingPolicy(interval=300, max_interval=300)
+
+
+@dataclass
+class SurroundSoundProcessorData:
+    input: int
+    muted: bool
+    volume: int
+    temperature: int
+    input_video_timing: VideoTiming
+    hdmi_loop_through: int
+    input_hdcp_status: int
+    output_hdcp_status: int
+
+
+@dataclass
+class HDMISwitcherData:
+    input: int
+
+
+@dataclass
+class MatrixSwitcherData:
+    # The input tied to each output, indexed by output number - 1
+    ties: array
+
+
+class Query(NamedTuple):
+    # Name of the data class field the decoded response is stored in
+    field: str
+
+
+def is_input_source_missing(data: SurroundSoundProcessorData) -> bool:
+    # Models without HDCP status are assumed to always have a source
+    return data.input_hdcp_status == 0
+
+
+SURROUND_SOUND_PROCESSOR_QUERIES = {
+    "$": Query("input"),
+    "Z": Query("muted"),
+    "V": Query("volume"),
+    "\x1b" + "20STAT": Query("temperature"),
+    "34I": Query("input_video_timing"),
+    "\x1b" + "LOUT": Query("hdmi_loop_through"),
+    "\x1b" + "IHDCP": Query("input_hdcp_status"),
+    "\x1b" + "OHDCP": Query("output_hdcp_status"),
+}
+
+HDMI_SWITCHER_QUERIES = {
+    "!": Query("input"),
+}
+
+_DataT = TypeVar("_DataT")
+
+
+def get_rollback(previous: Any, current: Any, changes: dict[str, Any]) -> dict[str, Any]:
+    """Return the previous values of the changes that failed, unless something else has updated them since"""
+    return {name: getattr(previous, name) for name, value in changes.items() if getattr(current, name) == value}
+
+
+class ExtronCoordinator(DataUpdateCoordinator[_DataT]):
+    """Polls the state of a device over the entry's persistent connection.
+
+    Only the queries that the adaptive scheduler considers due are sent, in a single pipelined batch, and their
+    responses are merged into the previous data. Refreshes are triggered by the fleet, which spreads the devices
+    over the tick interval.
+    """
+
+    data_class: type[_DataT]
+    queries: dict[str, Query]
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        connection: ExtronConnection,
+        name: str,
+        push_updates: bool,
+        capabilities: ModelCapabilities,
+    ) -> None:
+        super().__init__(
+            hass,
+            logger,
+            config_entry=entry,
+            name=name,
+            # The fleet triggers refreshes
+            update_interval=None,
+            always_update=False,
+        )
+        self.connection = connection
+        self.capabilities = capabilities
+        # Queries the model doesn't support are never sent
+        self.queries = {command: query for command, query in self.queries.items() if self.is_query_supported(command)}
+        policies = self.create_polling_policies(push_updates)
+        self.scheduler = AdaptivePollingScheduler({command: policies[command] for command in self.queries})
+        # When the state of each of the device's entities last changed, by unique ID
+        self.last_changed: dict[str, datetime] = {}
+        self.unavailable_after = entry.options.get(OPTION_UNAVAILABLE_AFTER, UNAVAILABLE_AFTER_SECONDS)
+        # When updates started failing, None while they succeed
+        self._failing_since: float | None = None
+
+    @abstractmethod
+    def create_polling_policies(self, push_updates: bool) -> dict[str, PollingPolicy]:
+        pass
+
+    def is_query_supported(self, command: str) -> bool:
+        return self.capabilities.supports(command)
+
+    async def query_data(self) -> _DataT | None:
+        """Query whatever is due, or return None without talking to the device when nothing is"""
+        now = time.monotonic()
+        commands = self.scheduler.due(now, self.data)
+        if not commands:
+            return None
+
+        # Failed queries stay due. That's cheap, a broken connection fails fast while it's being re-established.
+        responses = await self.connection.run_commands(commands, background=True)
+
+        values = {}
+        for command, response in zip(commands, responses, strict=True):
+            query = self.queries[command]
+            values[query.field] = decode_response(command, response)
+            changed = self.data is None or getattr(self.data, query.field) != values[query.field]
+            self.scheduler.record(command, changed, now)
+
+        if self.data is None:
+            # Values that aren't queried stay unknown
+            return self.data_class(**({field.name: None for field in fields(self.data_class)} | values))
+
+        return replace(self.data, **values)
+
+    @callback
+    def handle_notification(self, notification: Notification) -> None:
+        if self.data is None or notification.name not in {field.name for field in fields(self.data)}:
+            return
+
+        if getattr(self.data, notification.name) != notification.value:
+            self._async_publish(replace(self.data, **{notification.name: notification.value}))
+
+    @callback
+    def async_publish_changes(self, **changes: Any) -> None:
+        self._async_publish(replace(self.data, **changes))
+
+    async def async_send_command(self, command: str, previous: _DataT | None = None, **changes: Any) -> None:
+        """Send a command and publish its expected outcome immediately.
+
+        The acknowledgement sent by the device confirms (or corrects) the new state. If the command fails, the
+        changed values are rolled back unless something else has updated them in the meantime.
+        """
+        await self.async_send_commands([command], previous, **changes)
+
+    async def async_send_commands(self, commands: list[str], previous: _DataT | None = None, **changes: Any) -> None:
+        """Like async_send_command(), but for multiple commands sent in one pipelined batch.
+
+        The previous data is what's rolled back to on failure, by default the data before the changes. Callers that
+        have already published an unconfirmed value must pass the data from before that.
+        """
+        if previous is None:
+            previous = self.data
+        self.async_publish_changes(**changes)
+
+        # Things tend to change around user actions, poll more eagerly for a while
+        self.scheduler.reset(time.monotonic())
+
+        try:
+            responses = await self.connection.run_commands(commands)
+        except BaseException:
+            # Cancellation (e.g. a broadcast timing out) leaves the changes just as unconfirmed as a failure
+            rollback = get_rollback(previous, self.data, changes)
+            if rollback:
+                self._async_publish(replace(self.data, **rollback))
+            raise
+
+        for response in responses:
+            notification = parse_notification(response)
+            if notification is not None:
+                self.handle_notification(notification)
+
+    async def async_apply_state(self, **target: Any) -> None:
+        """Bring the device to the target state in one batch, skipping the values that are already as requested"""
+        changes = {name: value for name, value in target.items() if getattr(self.data, name) != value}
+        if changes:
+            await self.async_send_commands(
+                [self.create_command(name, value) for name, value in changes.items()], **changes
+            )
+
+    def create_command(self, name: str, value: Any) -> str:
+        """Return the command that sets the named value"""
+        raise ValueError(f"{name} can't be changed")
+
+    async def async_reboot(self) -> None:
+        """Reboot the device. Polling is suspended until it's back, then everything is refreshed at once."""
+        await self.connection.reboot()
+
+        self.config_entry.async_create_background_task(
+            self.hass, self._async_resync_after_reboot(), "extron_resync_after_reboot"
+        )
+
+    async def _async_resync_after_reboot(self) -> None:
+        await self.connection.wait_connected()
+        self.scheduler.expire()
+        await self.async_refresh()
+
+    async def async_recall_preset(self, preset: int) -> None:
+        """Recall a preset stored on the device, then refresh everything since anything may have changed"""
+        await self.connection.run_command(f"{preset}.")
+        self.scheduler.expire()
+        await self.async_refresh()
+
+    @callback
+    def _async_publish(self, data: _DataT) -> None:
+        # Unlike async_set_updated_data() this leaves the polling schedule alone
+        self.data = data
+        self.async_update_listeners()
+
+    async def _async_update_data(self) -> _DataT:
+        # Polls would only fail while the device is rebooting
+        if self.connection.is_rebooting:
+            return self.data
+
+        now = time.monotonic()
+
+        try:
+            data = await self.query_data()
+            if data is None:
+                # Nothing was due, so only the connection itself says anything about the device
+                if not self.connection.is_connected() or self.connection.circuit_breaker.is_open:
+                    raise ConnectionError("Device is not responding")
+
+                data = self.data
+        except Exception as e:
+            # Polls can be minutes apart, so the outage is measured from the first failure rather than the last poll
+            if self._failing_since is None:
+                self._failing_since = now
+
+            # Ride out short outages with the last known state instead of flapping the entities
+            if self.data is not None and now - self._failing_since < self.unavailable_after:
+                logger.debug(f"Unable to query device state, keeping the previous state: {e}")
+                return self.data
+
+            raise UpdateFailed(f"Unable to query device state: {e}") from e
+
+        self._failing_since = None
+
+        return data
+
+
+class SurroundSoundProcessorCoordinator(ExtronCoordinator[SurroundSoundProcessorData]):
+    data_class = SurroundSoundProcessorData
+    queries = SURROUND_SOUND_PROCESSOR_QUERIES
+
+    def create_polling_policies(self, push_updates: bool) -> dict[str, PollingPolicy]:
+        notified_policy = RECONCILIATION_POLLING_POLICY if push_updates else FAST_POLLING_POLICY
+
+        return {
+            "$": notified_policy,
+            "Z": notified_policy,
+            "V": notified_policy,
+            "\x1b" + "20STAT": SLOW_POLLING_POLICY,
+            # The input resolution is meaningless without a source
+            "34I": replace(SLOW_POLLING_POLICY, paused=is_input_source_missing),
+            "\x1b" + "LOUT": STATIC_POLLING_POLICY,
+            "\x1b" + "IHDCP": notified_policy,
+            "\x1b" + "OHDCP": notified_policy,
+        }
+
+    def create_command(self, name: str, value: Any) -> str:
+        if name == "input":
+            return f"{value}$"
+        if name == "volume":
+            return f"{value}V"
+        if name == "muted":
+            return "1Z" if value else "0Z"
+
+        return super().create_command(name, value)
+
+
+class HDMISwitcherCoordinator(ExtronCoordinator[HDMISwitcherData]):
+    data_class = HDMISwitcherData
+    queries = HDMI_SWITCHER_QUERIES
+
+    def create_polling_policies(self, push_updates: bool) -> dict[str, PollingPolicy]:
+        return {"!": RECONCILIATION_POLLING_POLICY if push_updates else FAST_POLLING_POLICY}
+
+    def create_command(self, name: str, value: Any) -> str:
+        if name == "input":
+            return f"{value}!"
+
+        return super().create_command(name, value)
+
+
+class MatrixSwitcherCoordinator(ExtronCoordinator[MatrixSwitcherData]):
+    """Polls the tie table of a matrix switcher.
+
+    The table is read in chunks of outputs, which are always sent together, so the whole table is refreshed in one
+    round trip regardless of the number of outputs.
+    """
+
+    data_class = MatrixSwitcherData
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        entry: ConfigEntry,
+        connection: ExtronConnection,
+        name: str,
+        push_updates: bool,
+        capabilities: ModelCapabilities,
+    ) -> None:
+        self.num_inputs = capabilities.num_inputs
+        self.num_outputs = capabilities.num_outputs
+        # The responses are combined into a single table by query_data()
+        self.queries = {command: Query("ties") for command in tie_table_queries(self.num_outputs)}
+        super().__init__(hass, entry, connection, name, push_updates, capabilities)
+
+    def create_polling_policies(self, push_updates: bool) -> dict[str, PollingPolicy]:
+        policy = RECONCILIATION_POLLING_POLICY if push_updates else FAST_POLLING_POLICY
+
+        return {command: policy for command in self.queries}
+
+    def is_query_supported(self, command: str) -> bool:
+        # The tie table queries depend on the number of outputs, every matrix switcher supports them
+        return True
+
+    async def query_data(self) -> MatrixSwitcherData | None:
+        now = time.monotonic()
+        if not self.scheduler.due(now, self.data):
+            return None
+
+        commands = list(self.queries)
+        responses = await self.connection.run_commands(commands, background=True)
+        ties = parse_tie_table(responses, self.num_outputs)
+
+        changed = self.data is None or self.data.ties != ties
+        for command in commands:
+            self.scheduler.record(command, changed, now)
+
+        return MatrixSwitcherData(ties)
+
+    @callback
+    def handle_notification(self, notification: Notification) -> None:
+        if self.data is None or notification.name != "tie":
+            return
+
+        output, input_number = notification.value
+        if 1 <= output <= self.num_outputs and self.data.ties[output - 1] != input_number:
+            self._async_publish(MatrixSwitcherData(self._with_ties({output: input_number})))
+
+    async def async_apply_ties(self, ties: dict[int, int]) -> None:
+        """Tie inputs to outputs (output -> input), sending commands only for the ties that actually change.
+
+        The changed ties are published immediately and sent in one batch. If the batch fails, the ties are rolled
+        back unless something else has changed them in the meantime.
+        """
+        changes = diff_ties(self.data.ties, ties)
+        if not changes:
+            return
+
+        previous = self.data.ties
+        self._async_publish(MatrixSwitcherData(self._with_ties(changes)))
+        self.scheduler.reset(time.monotonic())
+
+        try:
+            responses = await self.connection.run_commands(
+                [tie_command(input_number, output) for output, input_number in changes.items()]
+            )
+        except BaseException:
+            # Including cancellation, see async_send_commands()
+            rollback = {
+                output: previous[output - 1]
+                for output, input_number in changes.items()
+                if self.data.ties[output - 1] == input_number
+            }
+            if rollback:
+                self._async_publish(MatrixSwitcherData(self._with_ties(rollback)))
+            raise
+
+        for response in responses:
+            notification = parse_notification(response)
+            if notification is not None:
+                self.handle_notification(notification)
+
+    def _with_ties(self, changes: dict[int, int]) -> array:
+        ties = array(self.data.ties)
+        for output, input_number in changes.items():
+            ties[output - 1] = input_number
+
+        return ties
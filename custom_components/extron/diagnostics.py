@@ -1,11 +1,40 @@
 from typing import Any
 
+from homeassistant.components.diagnostics import async_redact_data
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 
+from custom_components.extron import ExtronConfigEntryRuntimeData
+from custom_components.extron.const import CONF_PASSWORD
+from custom_components.extron.metrics import command_code
+
+TO_REDACT = {CONF_PASSWORD}
+
 
 async def async_get_config_entry_diagnostics(_hass: HomeAssistant, entry: ConfigEntry) -> dict[str, Any]:
     """Return diagnostics for a config entry."""
+    runtime_data: ExtronConfigEntryRuntimeData = entry.runtime_data
+    connection = runtime_data.connection
+    coordinator = runtime_data.coordinator
+
     return {
-        "entry_data": entry.data,
+        "entry_data": async_redact_data(entry.data, TO_REDACT),
+        "entry_options": dict(entry.options),
+        "connection": {
+            "connected": connection.is_connected(),
+            "metrics": connection.metrics.as_dict(),
+            "response_cache": {
+                "hits": connection.response_cache.hits,
+                "misses": connection.response_cache.misses,
+            },
+        },
+        "polling_intervals": {
+            command_code(command): coordinator.scheduler.get_interval(command) for command in coordinator.queries
+        },
+        "last_changed": {
+            unique_id: changed_at.isoformat()
+            for unique_id, changed_at in sorted(
+                coordinator.last_changed.items(), key=lambda item: item[1], reverse=True
+            )
+        },
     }
@@ -0,0 +1,116 @@
+"""Discovery of Extron devices by probing a list of addresses."""
+
+import asyncio
+import ipaddress
+import logging
+import re
+
+from dataclasses import dataclass
+
+from pyextron import AuthenticationError, DeviceType, ExtronDevice
+
+from custom_components.extron.capabilities import CAPABILITY_REGISTRY
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.const import DEVICE_TYPE_MATRIX_SWITCHER
+
+logger = logging.getLogger(__name__)
+
+# Most probed addresses don't answer at all, so keep the timeout short
+PROBE_TIMEOUT_SECONDS = 2
+PROBE_MAX_CONCURRENCY = 64
+# A /22 network, larger scans are almost certainly a typo
+MAX_PROBED_ADDRESSES = 1024
+
+# Model families, for models that aren't in the capability registry
+DEVICE_TYPE_MODEL_PREFIXES = [
+    ("SSP", DeviceType.SURROUND_SOUND_PROCESSOR.value),
+    ("SW", DeviceType.HDMI_SWITCHER.value),
+    ("DXP", DEVICE_TYPE_MATRIX_SWITCHER),
+    ("XTP", DEVICE_TYPE_MATRIX_SWITCHER),
+]
+
+
+@dataclass(frozen=True)
+class DiscoveredDevice:
+    host: str
+    model_name: str
+    mac_address: str
+    device_type: str | None
+
+
+def parse_addresses(text: str) -> list[str]:
+    """Parse a list of hosts and networks separated by commas or whitespace, e.g. 10.0.0.5, 192.168.1.0/24"""
+    addresses: list[str] = []
+
+    for token in re.split(r"[,\s]+", text.strip()):
+        if not token:
+            continue
+
+        if "/" in token:
+            network = ipaddress.ip_network(token, strict=False)
+            # Check the size before expanding, a typo like /8 would take ages and millions of strings. The network
+            # and broadcast addresses aren't probed.
+            if len(addresses) + network.num_addresses - 2 > MAX_PROBED_ADDRESSES:
+                raise ValueError(f"Refusing to probe more than {MAX_PROBED_ADDRESSES} addresses")
+
+            addresses.extend(str(host) for host in network.hosts())
+        else:
+            addresses.append(token)
+
+        if len(addresses) > MAX_PROBED_ADDRESSES:
+            raise ValueError(f"Refusing to probe more than {MAX_PROBED_ADDRESSES} addresses")
+
+    return list(dict.fromkeys(addresses))
+
+
+def infer_device_type(model_name: str) -> str | None:
+    capabilities = CAPABILITY_REGISTRY.find_model(model_name)
+    if capabilities is not None:
+        return capabilities.device_type
+
+    for prefix, device_type in DEVICE_TYPE_MODEL_PREFIXES:
+        if model_name.upper().startswith(prefix):
+            return device_type
+
+    return None
+
+
+async def identify_device(host: str, port: int, password: str, timeout: float) -> DiscoveredDevice:
+    """Log in and query the model name and MAC address in the same session and round trip"""
+    connection = ExtronConnection(ExtronDevice(host, port, password, timeout=timeout), timeout=timeout)
+    await connection.connect()
+
+    try:
+        model_name, mac_address = await connection.run_commands(["1I", "\x1b" + "CH"])
+    finally:
+        await connection.close()
+
+    return DiscoveredDevice(host, model_name, mac_address, infer_device_type(model_name))
+
+
+async def discover_devices(
+    hosts: list[str],
+    port: int,
+    password: str,
+    timeout: float = PROBE_TIMEOUT_SECONDS,
+    max_concurrency: int = PROBE_MAX_CONCURRENCY,
+) -> tuple[list[DiscoveredDevice], int]:
+    """Probe the hosts in parallel. Returns the identified devices and the number of devices that rejected the
+    password."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def probe(host: str) -> DiscoveredDevice | Exception:
+        async with semaphore:
+            try:
+                return await identify_device(host, port, password, timeout)
+            except Exception as e:
+                # Nothing listening, or something that doesn't speak SIS
+                return e
+
+    results = await asyncio.gather(*[probe(host) for host in hosts])
+
+    devices = [result for result in results if isinstance(result, DiscoveredDevice)]
+    auth_failures = sum(isinstance(result, AuthenticationError) for result in results)
+    logger.debug(f"Probed {len(hosts)} addresses, found {len(devices)} devices, {auth_failures} rejected the password")
+
+    return devices, auth_failures
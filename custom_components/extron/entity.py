@@ -1,22 +1,114 @@
 import logging
 
 from abc import abstractmethod
+from typing import Any, TypeVar
 
 from homeassistant.components.binary_sensor import BinarySensorEntity
 from homeassistant.components.sensor import SensorEntity
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
 from homeassistant.helpers.device_registry import DeviceInfo
-from pyextron import SurroundSoundProcessor
+from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
 from custom_components.extron import DeviceInformation
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.coordinator import (
+    ExtronCoordinator,
+    SurroundSoundProcessorCoordinator,
+    SurroundSoundProcessorData,
+)
+from custom_components.extron.metrics import ConnectionMetrics
 
 logger = logging.getLogger(__name__)
 
+_CoordinatorT = TypeVar("_CoordinatorT", bound=ExtronCoordinator)
 
-class ExtronSurroundSoundProcessorSensorEntity(SensorEntity):
+
+class ExtronCoordinatorEntity(CoordinatorEntity[_CoordinatorT]):
+    """An entity that only writes its state when it has changed.
+
+    Every coordinator update would otherwise write the state of every entity of the device, although an update
+    usually changes only one of them. The availability, state and attributes are compared with the ones last
+    written, and changes are recorded in the coordinator's last changed index.
+    """
+
+    _written_snapshot: tuple[Any, ...] | None = None
+
+    @property
+    def available(self) -> bool:
+        # There's no data yet when the entry was set up from cached device information
+        return super().available and self.coordinator.data is not None
+
+    def _create_snapshot(self) -> tuple[Any, ...]:
+        # The state of an unavailable entity can't be computed and isn't shown
+        if not self.available:
+            return (False,)
+
+        return True, self.state, self.state_attributes, self.extra_state_attributes
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        snapshot = self._create_snapshot()
+        if snapshot != self._written_snapshot:
+            self._written_snapshot = snapshot
+            self.coordinator.last_changed[self.unique_id] = dt_util.utcnow()
+
+        super().async_write_ha_state()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        if self._create_snapshot() != self._written_snapshot:
+            self.async_write_ha_state()
+
+
+class ExtronSurroundSoundProcessorSensorEntity(
+    ExtronCoordinatorEntity[SurroundSoundProcessorCoordinator], SensorEntity
+):
+    def __init__(
+        self,
+        coordinator: SurroundSoundProcessorCoordinator,
+        device_information: DeviceInformation,
+        name: str,
+        unique_id: str,
+    ) -> None:
+        super().__init__(coordinator)
+        self._device_information = device_information
+        self._name = name
+        self._unique_id = unique_id
+
+    @property
+    def unique_id(self) -> str | None:
+        return f"extron_{self._device_information.mac_address}_{self._unique_id}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return self._device_information.device_info
+
+    @property
+    def name(self):
+        return f"Extron {self._device_information.model_name} {self._name}"
+
+    @abstractmethod
+    def get_native_value(self, data: SurroundSoundProcessorData):
+        return None
+
+    @property
+    def native_value(self):
+        return self.get_native_value(self.coordinator.data)
+
+
+class ExtronSurroundSoundProcessorBinarySensorEntity(
+    ExtronCoordinatorEntity[SurroundSoundProcessorCoordinator], BinarySensorEntity
+):
     def __init__(
-        self, ssp: SurroundSoundProcessor, device_information: DeviceInformation, name: str, unique_id: str
+        self,
+        coordinator: SurroundSoundProcessorCoordinator,
+        device_information: DeviceInformation,
+        name: str,
+        unique_id: str,
     ) -> None:
-        self._ssp = ssp
+        super().__init__(coordinator)
         self._device_information = device_information
         self._name = name
         self._unique_id = unique_id
@@ -34,25 +126,29 @@ class ExtronSurroundSoundProcessorSensorEntity(SensorEntity):
         return f"Extron {self._device_information.model_name} {self._name}"
 
     @abstractmethod
-    async def query_sensor_native_value(self):
+    def get_is_on(self, data: SurroundSoundProcessorData):
         return None
 
-    async def async_update(self):
-        try:
-            async with self._ssp._device.connection():
-                self._attr_native_value = await self.query_sensor_native_value()
-        except Exception:
-            logger.exception(f"async_update from {self.name} encountered error:")
-            self._attr_available = False
-        else:
-            self._attr_available = True
+    @property
+    def is_on(self):
+        return self.get_is_on(self.coordinator.data)
+
 
+class ExtronConnectionSensorEntity(SensorEntity):
+    """A sensor showing one of the connection metrics. The metrics are kept in memory, polling them is free."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_should_poll = True
 
-class ExtronSurroundSoundProcessorBinarySensorEntity(BinarySensorEntity):
     def __init__(
-        self, ssp: SurroundSoundProcessor, device_information: DeviceInformation, name: str, unique_id: str
+        self,
+        connection: ExtronConnection,
+        device_information: DeviceInformation,
+        name: str,
+        unique_id: str,
     ) -> None:
-        self._ssp = ssp
+        self._connection = connection
         self._device_information = device_information
         self._name = name
         self._unique_id = unique_id
@@ -70,15 +166,9 @@ class ExtronSurroundSoundProcessorBinarySensorEntity(BinarySensorEntity):
         return f"Extron {self._device_information.model_name} {self._name}"
 
     @abstractmethod
-    async def query_is_on(self):
+    def get_native_value(self, metrics: ConnectionMetrics):
         return None
 
-    async def async_update(self):
-        try:
-            async with self._ssp._device.connection():
-                self._attr_is_on = await self.query_is_on()
-        except Exception:
-            logger.exception(f"async_update from {self.name} encountered error:")
-            self._attr_available = False
-        else:
-            self._attr_available = True
+    @property
+    def native_value(self):
+        return self.get_native_value(self._connection.metrics)
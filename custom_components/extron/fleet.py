@@ -0,0 +1,72 @@
+"""Polling of all configured devices from one scheduler."""
+
+import asyncio
+import math
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+GOLDEN_RATIO_CONJUGATE = (math.sqrt(5) - 1) / 2
+
+
+def phase_for_slot(slot: int) -> float:
+    """Return the poll phase of a slot as a fraction of the tick interval.
+
+    Consecutive slots are spread using the golden ratio, which keeps the phases evenly distributed however many
+    devices there are, without moving the phases of existing devices when new ones are added.
+    """
+    return (slot * GOLDEN_RATIO_CONJUGATE) % 1
+
+
+@dataclass
+class FleetMember:
+    refresh: Callable[[], Awaitable[None]]
+    next_run: float
+    timer: asyncio.TimerHandle | None = None
+    task: asyncio.Task | None = None
+
+
+class Fleet:
+    """Triggers the periodic refresh of every device, each at its own phase within the tick interval.
+
+    The semaphore limits how many devices may be connecting or polling at the same time. Interactive commands don't
+    take it, so they are never queued behind the polls of other devices.
+    """
+
+    def __init__(self, tick_interval: float, max_concurrent_sessions: int) -> None:
+        self.semaphore = asyncio.Semaphore(max_concurrent_sessions)
+        self._tick_interval = tick_interval
+        self._members: dict[int, FleetMember] = {}
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def add(self, refresh: Callable[[], Awaitable[None]]) -> Callable[[], None]:
+        """Refresh periodically until the returned function is called"""
+        slot = next(slot for slot in range(len(self._members) + 1) if slot not in self._members)
+        loop = asyncio.get_running_loop()
+        member = FleetMember(refresh, loop.time() + phase_for_slot(slot) * self._tick_interval)
+        self._members[slot] = member
+        self._schedule(member)
+
+        def remove() -> None:
+            if member.timer is not None:
+                member.timer.cancel()
+            del self._members[slot]
+
+        return remove
+
+    def _schedule(self, member: FleetMember) -> None:
+        member.timer = asyncio.get_running_loop().call_at(member.next_run, self._run, member)
+
+    def _run(self, member: FleetMember) -> None:
+        loop = asyncio.get_running_loop()
+
+        # Keep the phase even if the loop has fallen behind
+        while member.next_run <= loop.time():
+            member.next_run += self._tick_interval
+        self._schedule(member)
+
+        # A device that is still busy with its previous refresh skips this one
+        if member.task is None or member.task.done():
+            member.task = loop.create_task(member.refresh())
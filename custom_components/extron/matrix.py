@@ -0,0 +1,46 @@
+"""Tie state of matrix switchers."""
+
+import re
+
+from array import array
+
+# The tie table is read in chunks of this many outputs, all chunks are sent in the same batch
+TIE_TABLE_CHUNK_SIZE = 16
+
+MATRIX_SIZE_PATTERN = re.compile(r"^V(?:id)?(\d+)X(\d+)")
+
+
+def parse_matrix_size(response: str) -> tuple[int, int]:
+    """Parse the number of inputs and outputs from the response to the information (I) query, e.g. V8X4 A8X4"""
+    match = MATRIX_SIZE_PATTERN.match(response)
+    if not match:
+        raise ValueError(f"Unable to parse matrix size from {response!r}")
+
+    return int(match.group(1)), int(match.group(2))
+
+
+def tie_table_queries(num_outputs: int) -> list[str]:
+    # Esc 0*{first output}*1VC reads the current video ties (preset 0) of the chunk starting at the given output
+    return ["\x1b" + f"0*{output}*1VC" for output in range(1, num_outputs + 1, TIE_TABLE_CHUNK_SIZE)]
+
+
+def parse_tie_table(responses: list[str], num_outputs: int) -> array:
+    """Return the input tied to each output, indexed by output number - 1. Input 0 means the output is untied."""
+    ties = array("H")
+    for response in responses:
+        # The inputs are separated by spaces, some models append a non-numeric tag to the response
+        ties.extend(int(token) for token in response.split() if token.isdigit())
+
+    if len(ties) < num_outputs:
+        raise ValueError(f"Expected ties for {num_outputs} outputs, got {len(ties)}")
+
+    return ties[:num_outputs]
+
+
+def tie_command(input_number: int, output: int) -> str:
+    return f"{input_number}*{output}!"
+
+
+def diff_ties(current: array, ties: dict[int, int]) -> dict[int, int]:
+    """Return the requested ties (output -> input) that differ from the current ones"""
+    return {output: input_number for output, input_number in ties.items() if current[output - 1] != input_number}
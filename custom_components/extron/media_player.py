@@ -1,9 +1,14 @@
 import logging
 
-from datetime import timedelta
+from dataclasses import replace
+
+import voluptuous as vol
 
 from bidict import bidict
 from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
     MediaPlayerDeviceClass,
     MediaPlayerEntity,
     MediaPlayerEntityFeature,
@@ -11,42 +16,105 @@ from homeassistant.components.media_player import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_platform
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from pyextron import DeviceType, ExtronDevice, HDMISwitcher, SurroundSoundProcessor
+from pyextron import DeviceType
 
 from custom_components.extron import DeviceInformation, ExtronConfigEntryRuntimeData
-from custom_components.extron.const import CONF_DEVICE_TYPE
+from custom_components.extron.const import (
+    ATTR_DURATION,
+    ATTR_PRESET,
+    ATTR_TIES,
+    CONF_DEVICE_TYPE,
+    DEVICE_TYPE_MATRIX_SWITCHER,
+    SERVICE_APPLY_SCENE,
+    SERVICE_RAMP_VOLUME,
+    SERVICE_RECALL_PRESET,
+)
+from custom_components.extron.coordinator import (
+    ExtronCoordinator,
+    HDMISwitcherCoordinator,
+    MatrixSwitcherCoordinator,
+    SurroundSoundProcessorCoordinator,
+)
+from custom_components.extron.entity import ExtronCoordinatorEntity
+from custom_components.extron.services import SCENE_SCHEMA
+from custom_components.extron.volume import VolumeController
 
 logger = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=30)
-
 
 def make_source_bidict(num_sources: int, input_names: list[str]) -> bidict:
     # Use user-defined input name for the source when available
     return bidict({i + 1: input_names[i] if i < len(input_names) else str(i + 1) for i in range(num_sources)})
 
 
+def resolve_source(source_bidict: bidict, source: str | int, allow_untie: bool = False) -> int:
+    """Return the input number of a source given by name or number. Input 0 unties a matrix switcher output."""
+    if source in source_bidict.inverse:
+        return source_bidict.inverse[source]
+    if str(source).isdigit() and (int(source) in source_bidict or (allow_untie and int(source) == 0)):
+        return int(source)
+
+    raise ServiceValidationError(f"Unknown source {source}")
+
+
+def check_scene_fields(scene: dict, scene_fields: frozenset[str], target: str) -> None:
+    """Reject a scene with fields the target can't apply, rather than applying only part of it"""
+    unsupported = sorted(scene.keys() - scene_fields)
+    if unsupported:
+        raise ServiceValidationError(f"{target} can't apply {', '.join(unsupported)}")
+
+
 async def async_setup_entry(_hass: HomeAssistant, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     # Extract stored runtime data from the entry
     runtime_data: ExtronConfigEntryRuntimeData = entry.runtime_data
-    device = runtime_data.device
+    coordinator = runtime_data.coordinator
     device_information = runtime_data.device_information
     input_names = runtime_data.input_names
 
     # Add entities
     if entry.data[CONF_DEVICE_TYPE] == DeviceType.SURROUND_SOUND_PROCESSOR.value:
-        ssp = SurroundSoundProcessor(device)
-        async_add_entities([ExtronSurroundSoundProcessor(ssp, device_information, input_names)], update_before_add=True)
+        async_add_entities([ExtronSurroundSoundProcessor(coordinator, device_information, input_names)])
     elif entry.data[CONF_DEVICE_TYPE] == DeviceType.HDMI_SWITCHER.value:
-        hdmi_switcher = HDMISwitcher(device)
-        async_add_entities([ExtronHDMISwitcher(hdmi_switcher, device_information, input_names)], update_before_add=True)
+        async_add_entities([ExtronHDMISwitcher(coordinator, device_information, input_names)])
+    elif entry.data[CONF_DEVICE_TYPE] == DEVICE_TYPE_MATRIX_SWITCHER:
+        async_add_entities(
+            [
+                ExtronMatrixSwitcherOutput(coordinator, device_information, input_names, output)
+                for output in range(1, coordinator.num_outputs + 1)
+            ]
+        )
+
+    # Register custom services
+    platform = entity_platform.async_get_current_platform()
+    platform.async_register_entity_service(
+        SERVICE_RAMP_VOLUME,
+        {
+            vol.Required(ATTR_MEDIA_VOLUME_LEVEL): cv.small_float,
+            vol.Required(ATTR_DURATION): vol.All(vol.Coerce(float), vol.Range(min=0, max=60)),
+        },
+        "async_ramp_volume",
+        [MediaPlayerEntityFeature.VOLUME_SET],
+    )
+    platform.async_register_entity_service(SERVICE_APPLY_SCENE, SCENE_SCHEMA, "async_apply_scene")
+    platform.async_register_entity_service(
+        SERVICE_RECALL_PRESET,
+        {vol.Required(ATTR_PRESET): vol.All(vol.Coerce(int), vol.Range(min=1))},
+        "async_recall_preset",
+    )
+
 
+class AbstractExtronMediaPlayerEntity(ExtronCoordinatorEntity[ExtronCoordinator], MediaPlayerEntity):
+    # The fields of the apply_scene and broadcast_scene services the device can apply
+    scene_fields = frozenset([ATTR_INPUT_SOURCE])
 
-class AbstractExtronMediaPlayerEntity(MediaPlayerEntity):
-    def __init__(self, device: ExtronDevice, device_information: DeviceInformation, input_names: list[str]) -> None:
-        self._device = device
+    def __init__(
+        self, coordinator: ExtronCoordinator, device_information: DeviceInformation, input_names: list[str]
+    ) -> None:
+        super().__init__(coordinator)
         self._device_information = device_information
         self._input_names = input_names
         self._device_class = MediaPlayerDeviceClass.RECEIVER
@@ -78,16 +146,34 @@ class AbstractExtronMediaPlayerEntity(MediaPlayerEntity):
     def name(self):
         return f"Extron {self._device_information.model_name} media player"
 
+    async def async_apply_scene(self, **scene) -> None:
+        check_scene_fields(scene, self.scene_fields, self.name)
+
+        await self.coordinator.async_apply_state(**self.create_target_state(scene))
+
+    def create_target_state(self, scene: dict) -> dict:
+        if ATTR_INPUT_SOURCE in scene:
+            return {"input": resolve_source(self._source_bidict, scene[ATTR_INPUT_SOURCE])}
+
+        return {}
+
+    async def async_recall_preset(self, preset: int) -> None:
+        raise ServiceValidationError("Presets can only be recalled on matrix switchers")
+
 
 class ExtronSurroundSoundProcessor(AbstractExtronMediaPlayerEntity):
-    def __init__(self, ssp: SurroundSoundProcessor, device_information: DeviceInformation, input_names: list[str]):
-        super().__init__(ssp.get_device(), device_information, input_names)
-        self._ssp = ssp
+    def __init__(
+        self,
+        coordinator: SurroundSoundProcessorCoordinator,
+        device_information: DeviceInformation,
+        input_names: list[str],
+    ):
+        super().__init__(coordinator, device_information, input_names)
 
-        self._source = None
         self._source_bidict = self.create_source_bidict()
-        self._volume = None
-        self._muted = False
+        self._volume_controller = VolumeController(self._async_send_volume_level)
+
+    scene_fields = frozenset([ATTR_INPUT_SOURCE, ATTR_MEDIA_VOLUME_LEVEL, ATTR_MEDIA_VOLUME_MUTED])
 
     _attr_supported_features = (
         MediaPlayerEntityFeature.SELECT_SOURCE
@@ -99,22 +185,9 @@ class ExtronSurroundSoundProcessor(AbstractExtronMediaPlayerEntity):
     def get_device_type(self):
         return DeviceType.SURROUND_SOUND_PROCESSOR
 
-    async def async_update(self):
-        try:
-            async with self._ssp._device.connection():
-                self._source = self._source_bidict.get(await self._ssp.view_input())
-                self._muted = await self._ssp.is_muted()
-                volume = await self._ssp.get_volume_level()
-                self._volume = volume / 100
-        except Exception:
-            logger.exception("An error occurred while trying to update entity state")
-            self._attr_available = False
-        else:
-            self._attr_available = True
-
     @property
     def volume_level(self):
-        return self._volume
+        return self.coordinator.data.volume / 100
 
     @property
     def volume_step(self):
@@ -122,51 +195,76 @@ class ExtronSurroundSoundProcessor(AbstractExtronMediaPlayerEntity):
 
     @property
     def is_volume_muted(self):
-        return self._muted
+        return self.coordinator.data.muted
 
     @property
     def source(self):
-        return self._source
+        return self._source_bidict.get(self.coordinator.data.input)
 
     @property
     def source_list(self):
         return list(self._source_bidict.values())
 
     def create_source_bidict(self) -> bidict:
-        return make_source_bidict(5, self._input_names)
+        return make_source_bidict(self._device_information.capabilities.num_inputs, self._input_names)
 
     async def async_select_source(self, source):
-        async with self._ssp._device.connection():
-            await self._ssp.select_input(self._source_bidict.inverse.get(source))
+        source_input = resolve_source(self._source_bidict, source)
+        await self.coordinator.async_send_command(f"{source_input}$", input=source_input)
 
     async def async_mute_volume(self, mute: bool) -> None:
-        async with self._ssp._device.connection():
-            await self._ssp.mute() if mute else await self._ssp.unmute()
+        await self.coordinator.async_send_command("1Z" if mute else "0Z", muted=mute)
 
     async def async_set_volume_level(self, volume: float) -> None:
-        async with self._ssp._device.connection():
-            await self._ssp.set_volume_level(int(volume * 100))
+        confirmed = self._volume_controller.cancel()
+        await self._async_send_volume_level(int(volume * 100), confirmed)
 
     async def async_volume_up(self) -> None:
-        async with self._ssp._device.connection():
-            if int(self._volume * 100) < 100:
-                await self._ssp.increment_volume()
+        self._step_volume(1)
 
     async def async_volume_down(self) -> None:
-        async with self._ssp._device.connection():
-            if int(self._volume * 100) > 0:
-                await self._ssp.decrement_volume()
+        self._step_volume(-1)
+
+    def create_target_state(self, scene: dict) -> dict:
+        target = super().create_target_state(scene)
+        if ATTR_MEDIA_VOLUME_LEVEL in scene:
+            target["volume"] = int(scene[ATTR_MEDIA_VOLUME_LEVEL] * 100)
+        if ATTR_MEDIA_VOLUME_MUTED in scene:
+            target["muted"] = scene[ATTR_MEDIA_VOLUME_MUTED]
+
+        return target
+
+    async def async_apply_scene(self, **scene) -> None:
+        if ATTR_MEDIA_VOLUME_LEVEL in scene:
+            self._volume_controller.cancel()
+
+        await super().async_apply_scene(**scene)
+
+    async def async_ramp_volume(self, volume_level: float, duration: float) -> None:
+        await self._volume_controller.ramp(self.coordinator.data.volume, int(volume_level * 100), duration)
+
+    async def async_will_remove_from_hass(self) -> None:
+        self._volume_controller.cancel()
+        await super().async_will_remove_from_hass()
+
+    def _step_volume(self, delta: int) -> None:
+        # Show the new target right away, the command is sent once the steps stop coming
+        target = self._volume_controller.step(self.coordinator.data.volume, delta)
+        self.coordinator.async_publish_changes(volume=target)
+
+    async def _async_send_volume_level(self, volume_level: int, confirmed: int | None = None) -> None:
+        # Steps and ramps have already published their target, a failure rolls back to what the device last accepted
+        previous = None if confirmed is None else replace(self.coordinator.data, volume=confirmed)
+        await self.coordinator.async_send_command(f"{volume_level}V", previous, volume=volume_level)
 
 
 class ExtronHDMISwitcher(AbstractExtronMediaPlayerEntity):
     def __init__(
-        self, hdmi_switcher: HDMISwitcher, device_information: DeviceInformation, input_names: list[str]
+        self, coordinator: HDMISwitcherCoordinator, device_information: DeviceInformation, input_names: list[str]
     ) -> None:
-        super().__init__(hdmi_switcher.get_device(), device_information, input_names)
-        self._hdmi_switcher = hdmi_switcher
+        super().__init__(coordinator, device_information, input_names)
 
         self._state = MediaPlayerState.PLAYING
-        self._source = None
         self._source_bidict = self.create_source_bidict()
 
     _attr_supported_features = MediaPlayerEntityFeature.SELECT_SOURCE
@@ -174,39 +272,90 @@ class ExtronHDMISwitcher(AbstractExtronMediaPlayerEntity):
     def get_device_type(self):
         return DeviceType.HDMI_SWITCHER
 
-    async def async_update(self):
-        try:
-            async with self._hdmi_switcher._device.connection():
-                self._source = self._source_bidict.get(await self._hdmi_switcher.view_input())
-        except Exception:
-            logger.exception("An error occurred while trying to update entity state")
-            self._attr_available = False
-        else:
-            self._attr_available = True
-
     @property
     def source(self):
-        return self._source
+        return self._source_bidict.get(self.coordinator.data.input)
 
     @property
     def source_list(self):
         return list(self._source_bidict.values())
 
     def create_source_bidict(self) -> bidict:
-        model_name = self._device_information.model_name
-        sw = model_name.split(" ")[0]
+        return make_source_bidict(self._device_information.capabilities.num_inputs, self._input_names)
 
-        if sw == "SW2":
-            num_sources = 2
-        elif sw == "SW4":
-            num_sources = 4
-        elif sw == "SW6":
-            num_sources = 6
-        else:
-            num_sources = 8
+    async def async_select_source(self, source: str):
+        source_input = resolve_source(self._source_bidict, source)
+        await self.coordinator.async_send_command(f"{source_input}!", input=source_input)
 
-        return make_source_bidict(num_sources, self._input_names)
+
+class ExtronMatrixSwitcherOutput(ExtronCoordinatorEntity[MatrixSwitcherCoordinator], MediaPlayerEntity):
+    """One output of a matrix switcher, the source is the input tied to it"""
+
+    def __init__(
+        self,
+        coordinator: MatrixSwitcherCoordinator,
+        device_information: DeviceInformation,
+        input_names: list[str],
+        output: int,
+    ) -> None:
+        super().__init__(coordinator)
+        self._device_information = device_information
+        self._output = output
+        self._source_bidict = make_source_bidict(coordinator.num_inputs, input_names)
+
+    _attr_device_class = MediaPlayerDeviceClass.RECEIVER
+    _attr_supported_features = MediaPlayerEntityFeature.SELECT_SOURCE
+
+    scene_fields = frozenset([ATTR_INPUT_SOURCE, ATTR_TIES])
+
+    @property
+    def unique_id(self) -> str | None:
+        mac_address = self._device_information.mac_address
+
+        return f"extron_{DEVICE_TYPE_MATRIX_SWITCHER}_{mac_address}_output_{self._output}_media_player"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        return self._device_information.device_info
+
+    @property
+    def name(self):
+        return f"Extron {self._device_information.model_name} output {self._output}"
+
+    @property
+    def state(self):
+        # Untied outputs have nothing to show
+        if self.coordinator.data.ties[self._output - 1] == 0:
+            return MediaPlayerState.IDLE
+
+        return MediaPlayerState.PLAYING
+
+    @property
+    def source(self):
+        return self._source_bidict.get(self.coordinator.data.ties[self._output - 1])
+
+    @property
+    def source_list(self):
+        return list(self._source_bidict.values())
 
     async def async_select_source(self, source: str):
-        async with self._hdmi_switcher._device.connection():
-            await self._hdmi_switcher.select_input(self._source_bidict.inverse.get(source))
+        source_input = resolve_source(self._source_bidict, source)
+        await self.coordinator.async_apply_ties({self._output: source_input})
+
+    async def async_apply_scene(self, **scene) -> None:
+        check_scene_fields(scene, self.scene_fields, self.name)
+
+        # The source applies to this output, ties to any output of the switcher
+        ties = {
+            output: resolve_source(self._source_bidict, source, allow_untie=True)
+            for output, source in scene.get(ATTR_TIES, {}).items()
+        }
+        if ATTR_INPUT_SOURCE in scene:
+            ties[self._output] = resolve_source(self._source_bidict, scene[ATTR_INPUT_SOURCE], allow_untie=True)
+        if any(not 1 <= output <= self.coordinator.num_outputs for output in ties):
+            raise ServiceValidationError(f"Outputs must be between 1 and {self.coordinator.num_outputs}")
+
+        await self.coordinator.async_apply_ties(ties)
+
+    async def async_recall_preset(self, preset: int) -> None:
+        await self.coordinator.async_recall_preset(preset)
@@ -0,0 +1,106 @@
+"""Instrumentation of device connections."""
+
+import re
+
+from collections import Counter
+from typing import Any
+
+# Upper bounds of the round-trip time histogram buckets, in milliseconds
+ROUND_TRIP_TIME_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+SET_COMMAND_PATTERN = re.compile(r"^\d+(\*\d+)?[$!VZ]$")
+
+
+def command_code(command: str) -> str:
+    """Return the command with its arguments and control characters replaced, e.g. 40V -> #V"""
+    if SET_COMMAND_PATTERN.match(command):
+        command = re.sub(r"\d+", "#", command)
+
+    return command.replace("\x1b", "Esc")
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]) -> None:
+        self._buckets = buckets
+        # The last bucket counts everything above the largest bound
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    @property
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self._buckets) if value <= bound), len(self._buckets))
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def as_dict(self) -> dict[str, Any]:
+        labels = [f"<={bound}" for bound in self._buckets] + [f">{self._buckets[-1]}"]
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "max": self.max,
+            "buckets": dict(zip(labels, self.counts, strict=True)),
+        }
+
+
+class ConnectionMetrics:
+    """Counters and round-trip times of a single device connection.
+
+    Round-trip times are measured from writing a command until its response has been read, so commands sent in
+    the same batch include the time spent waiting for the ones before them. The total time per command code shows
+    which commands keep the device busy the most.
+    """
+
+    def __init__(self) -> None:
+        self.connects = 0
+        self.connect_failures = 0
+        self.auth_failures = 0
+        self.reconnects = 0
+        self.connection_losses = 0
+        self.timeouts = 0
+        self.error_responses = 0
+        self.circuit_breaker_trips = 0
+        self.notifications = 0
+        self.reboots = 0
+        # Seconds from the last reboot command until the device accepted a connection again
+        self.reboot_recovery_time: float | None = None
+        self.commands: Counter[str] = Counter()
+        self.command_time_ms: Counter[str] = Counter()
+        self.round_trip_time = Histogram(ROUND_TRIP_TIME_BUCKETS_MS)
+
+    @property
+    def commands_sent(self) -> int:
+        return self.commands.total()
+
+    def record_command(self, command: str, round_trip_time: float) -> None:
+        code = command_code(command)
+        round_trip_time_ms = round_trip_time * 1000
+        self.commands[code] += 1
+        self.command_time_ms[code] += round_trip_time_ms
+        self.round_trip_time.observe(round_trip_time_ms)
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "auth_failures": self.auth_failures,
+            "reconnects": self.reconnects,
+            "connection_losses": self.connection_losses,
+            "timeouts": self.timeouts,
+            "error_responses": self.error_responses,
+            "circuit_breaker_trips": self.circuit_breaker_trips,
+            "notifications": self.notifications,
+            "reboots": self.reboots,
+            "reboot_recovery_time": self.reboot_recovery_time,
+            "commands_sent": self.commands_sent,
+            "commands": dict(self.commands.most_common()),
+            "command_time_ms": {code: round(time_ms, 1) for code, time_ms in self.command_time_ms.most_common()},
+            "round_trip_time_ms": self.round_trip_time.as_dict(),
+        }
@@ -0,0 +1,42 @@
+"""Parsing of unsolicited (verbose mode) messages sent by Extron devices."""
+
+import re
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class Notification:
+    # Name of the changed value, matches the field names of the coordinator data classes
+    name: str
+    value: Any
+
+
+# The converter is called with the groups of the match
+NOTIFICATION_PATTERNS: list[tuple[re.Pattern, str, Callable[..., Any]]] = [
+    (re.compile(r"^In(\d+)(?: \w+)?$"), "input", int),
+    # Matrix switchers report ties as output/input pairs
+    (re.compile(r"^Out(\d+) In(\d+)(?: \w+)?$"), "tie", lambda output, input: (int(output), int(input))),
+    (re.compile(r"^Vol(\d+)$"), "volume", int),
+    (re.compile(r"^Amt(\d)$"), "muted", lambda value: value == "1"),
+    (re.compile(r"^HdcpI(\d)$"), "input_hdcp_status", int),
+    (re.compile(r"^HdcpO(\d)$"), "output_hdcp_status", int),
+]
+
+# Commands that change a value are answered with the same tagged message the device uses for notifications
+TAGGED_RESPONSE_COMMAND_PATTERN = re.compile(r"^(\d+(\*\d+)?[$!VZ]|[+-]V)$")
+
+
+def parse_notification(line: str) -> Notification | None:
+    for pattern, name, converter in NOTIFICATION_PATTERNS:
+        match = pattern.match(line)
+        if match:
+            return Notification(name, converter(*match.groups()))
+
+    return None
+
+
+def expects_tagged_response(command: str) -> bool:
+    return TAGGED_RESPONSE_COMMAND_PATTERN.match(command) is not None
@@ -0,0 +1,99 @@
+"""Recording of the traffic of a device connection, for reproducing timing problems offline."""
+
+import asyncio
+import json
+import logging
+import time
+
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+REDACTED = "**REDACTED**"
+
+# Fields carrying commands and responses. A value that is a secret, e.g. a password sent as a line of its own, is
+# redacted, other values are left alone even if a short secret happens to appear in them.
+TRAFFIC_FIELDS = frozenset(["command", "commands", "response", "line"])
+# Fields carrying exception messages, which quote the command that failed
+ERROR_FIELDS = frozenset(["error", "reason"])
+
+
+class TrafficRecorder:
+    """Writes connection events, commands and responses to a JSONL trace.
+
+    Each line is an object with the time in seconds since recording started ("t"), the event name and its fields.
+    Secrets, i.e. the password, are redacted from the fields that may carry them before the event is serialized.
+    When the file grows beyond the maximum size it is rotated, keeping a single older file, so a trace never takes
+    more than twice the maximum size.
+
+    Events are buffered in memory and written from an executor, one write at a time, so recording doesn't block the
+    event loop.
+    """
+
+    def __init__(self, path: Path, max_bytes: int, secrets: list[str], flush_interval: float = 1.0) -> None:
+        self._path = path
+        self._max_bytes = max_bytes
+        self._secrets = [secret for secret in secrets if secret]
+        self._flush_interval = flush_interval
+        self._started_at = time.monotonic()
+        self._buffer: list[str] = []
+        self._flush_task: asyncio.Task | None = None
+        # Writes must not overlap, they would append out of order and could both rotate the file
+        self._write_lock = asyncio.Lock()
+
+    def record(self, event: str, **fields: Any) -> None:
+        fields = {name: self._redact(name, value) for name, value in fields.items()}
+        line = json.dumps({"t": round(time.monotonic() - self._started_at, 6), "event": event, **fields})
+
+        self._buffer.append(line + "\n")
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later())
+
+    async def close(self) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+
+        await self._flush()
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._flush_interval)
+        self._flush_task = None
+        await self._flush()
+
+    async def _flush(self) -> None:
+        async with self._write_lock:
+            lines, self._buffer = self._buffer, []
+            if lines:
+                try:
+                    await asyncio.get_running_loop().run_in_executor(None, self._write, lines)
+                except OSError:
+                    logger.warning(f"Unable to write traffic trace {self._path}", exc_info=True)
+
+    def _redact(self, name: str, value: Any) -> Any:
+        if name in TRAFFIC_FIELDS:
+            if isinstance(value, list):
+                return [self._redact(name, item) for item in value]
+
+            return REDACTED if value in self._secrets else value
+
+        if name in ERROR_FIELDS and isinstance(value, str):
+            for secret in self._secrets:
+                value = value.replace(repr(secret), repr(REDACTED))
+
+        return value
+
+    def _write(self, lines: list[str]) -> None:
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self._path.exists() and self._path.stat().st_size >= self._max_bytes:
+            self._path.replace(self._path.with_name(self._path.name + ".1"))
+
+        with self._path.open("a", encoding="utf-8") as file:
+            file.writelines(lines)
+
+
+def read_trace(path: Path) -> list[dict[str, Any]]:
+    with path.open(encoding="utf-8") as file:
+        return [json.loads(line) for line in file if line.strip()]
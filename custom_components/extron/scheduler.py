@@ -0,0 +1,60 @@
+"""Adaptive scheduling of device queries."""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class PollingPolicy:
+    # Intervals are in seconds
+    interval: float
+    max_interval: float
+    # Called with the current coordinator data, the query is skipped while this returns True
+    paused: Callable[[Any], bool] | None = None
+
+
+class AdaptivePollingScheduler:
+    """Decides which queries are due for polling.
+
+    Every query starts at its base interval. Each time a query returns the same value as before, its interval is
+    multiplied by the backoff factor, up to the maximum interval. A changed value or a user command brings the
+    interval back down to the base interval.
+    """
+
+    def __init__(self, policies: dict[str, PollingPolicy], backoff_factor: float = 2) -> None:
+        self._policies = policies
+        self._backoff_factor = backoff_factor
+        self._intervals = {command: policy.interval for command, policy in policies.items()}
+        self._next_due = {command: 0.0 for command in policies}
+
+    def get_interval(self, command: str) -> float:
+        return self._intervals[command]
+
+    def due(self, now: float, data: Any = None) -> list[str]:
+        return [
+            command
+            for command, policy in self._policies.items()
+            if now >= self._next_due[command] and not (data is not None and policy.paused and policy.paused(data))
+        ]
+
+    def record(self, command: str, changed: bool, now: float) -> None:
+        policy = self._policies[command]
+
+        if changed:
+            self._intervals[command] = policy.interval
+        else:
+            self._intervals[command] = min(policy.max_interval, self._intervals[command] * self._backoff_factor)
+
+        self._next_due[command] = now + self._intervals[command]
+
+    def expire(self) -> None:
+        """Make every query due immediately, e.g. after something has changed the whole device state"""
+        for command, policy in self._policies.items():
+            self._intervals[command] = policy.interval
+            self._next_due[command] = 0.0
+
+    def reset(self, now: float) -> None:
+        for command, policy in self._policies.items():
+            self._intervals[command] = policy.interval
+            self._next_due[command] = min(self._next_due[command], now + policy.interval)
@@ -1,76 +1,262 @@
 import logging
+import time
 
-from datetime import timedelta
+from abc import abstractmethod
 
-from homeassistant.components.sensor import SensorDeviceClass, SensorStateClass
+from homeassistant.components.sensor import RestoreSensor, SensorDeviceClass, SensorStateClass
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EntityCategory
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from pyextron import DeviceType, SurroundSoundProcessor
+from pyextron import DeviceType
 
 from custom_components.extron import DeviceInformation, ExtronConfigEntryRuntimeData
+from custom_components.extron.codec import VideoTiming
+from custom_components.extron.connection import ExtronConnection
 from custom_components.extron.const import CONF_DEVICE_TYPE
-from custom_components.extron.entity import ExtronSurroundSoundProcessorSensorEntity
+from custom_components.extron.coordinator import (
+    SurroundSoundProcessorCoordinator,
+    SurroundSoundProcessorData,
+    is_input_source_missing,
+)
+from custom_components.extron.entity import ExtronConnectionSensorEntity, ExtronSurroundSoundProcessorSensorEntity
+from custom_components.extron.metrics import ConnectionMetrics
+from custom_components.extron.statistics import (
+    DURATION_PUBLISH_INTERVAL_SECONDS,
+    TEMPERATURE_DEADBAND,
+    TEMPERATURE_MAX_HOLD_SECONDS,
+    Deadband,
+    DurationCounter,
+)
 
 logger = logging.getLogger(__name__)
 
-SCAN_INTERVAL = timedelta(seconds=60)
-
 
 async def async_setup_entry(hass, entry: ConfigEntry, async_add_entities: AddEntitiesCallback):
     # Extract stored runtime data from the entry
     runtime_data: ExtronConfigEntryRuntimeData = entry.runtime_data
-    device = runtime_data.device
+    coordinator = runtime_data.coordinator
+    connection = runtime_data.connection
     device_information = runtime_data.device_information
 
     # Add entities
+    async_add_entities(
+        [
+            ExtronCommandsSent(connection, device_information),
+            ExtronRoundTripTime(connection, device_information),
+            ExtronTimeouts(connection, device_information),
+            ExtronReconnects(connection, device_information),
+            ExtronRebootRecoveryTime(connection, device_information),
+        ]
+    )
+
     if entry.data[CONF_DEVICE_TYPE] == DeviceType.SURROUND_SOUND_PROCESSOR.value:
-        ssp = SurroundSoundProcessor(device)
+        entity_classes = [
+            ExtronDeviceTemperature,
+            ExtronInputResolution,
+            ExtronHdmiLoopThrough,
+            ExtronInputSignalTime,
+            ExtronOutputSinkTime,
+        ]
         async_add_entities(
             [
-                ExtronDeviceTemperature(ssp, device_information),
-                ExtronInputResolution(ssp, device_information),
-                ExtronHdmiLoopThrough(ssp, device_information),
-            ],
-            update_before_add=True,
+                entity_class(coordinator, device_information)
+                for entity_class in entity_classes
+                if device_information.capabilities.supports(entity_class.query)
+            ]
         )
 
-def parse_incoming_line_count(incoming_line_count: str) -> str:
-    parts = incoming_line_count.split("*")
 
-    return f"{parts[3]} x {parts[0]} @ {int(float(parts[1]))} Hz"
+def format_video_timing(video_timing: VideoTiming) -> str:
+    return f"{video_timing.pixels} x {video_timing.lines} @ {int(video_timing.vertical_frequency)} Hz"
+
 
 class ExtronDeviceTemperature(ExtronSurroundSoundProcessorSensorEntity):
-    def __init__(self, ssp: SurroundSoundProcessor, device_information: DeviceInformation) -> None:
-        super().__init__(ssp, device_information, "temperature", "temperature")
+    query = "\x1b" + "20STAT"
+
+    def __init__(self, coordinator: SurroundSoundProcessorCoordinator, device_information: DeviceInformation) -> None:
+        super().__init__(coordinator, device_information, "temperature", "temperature")
+
+        self._deadband = Deadband(TEMPERATURE_DEADBAND, TEMPERATURE_MAX_HOLD_SECONDS)
 
     _attr_device_class = SensorDeviceClass.TEMPERATURE
     _attr_native_unit_of_measurement = "°C"
     _attr_state_class = SensorStateClass.MEASUREMENT
 
-    async def query_sensor_native_value(self):
-        return await self._ssp.get_temperature()
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+        self._update_deadband()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # Once per update, the native value is read more than once per state write
+        self._update_deadband()
+        super()._handle_coordinator_update()
+
+    def _update_deadband(self) -> None:
+        if self.coordinator.data is not None:
+            self._deadband.update(self.coordinator.data.temperature, time.monotonic())
+
+    def get_native_value(self, data: SurroundSoundProcessorData):
+        # Unchanged states aren't recorded, so holding the value within the deadband saves a row per flip
+        return self._deadband.value
 
 
 class ExtronInputResolution(ExtronSurroundSoundProcessorSensorEntity):
-    def __init__(self, ssp: SurroundSoundProcessor, device_information: DeviceInformation) -> None:
-        super().__init__(ssp, device_information, "input resolution", "input_resolution")
+    query = "34I"
+
+    def __init__(self, coordinator: SurroundSoundProcessorCoordinator, device_information: DeviceInformation) -> None:
+        super().__init__(coordinator, device_information, "input resolution", "input_resolution")
 
         self._attr_entity_category = EntityCategory.DIAGNOSTIC
 
-    async def query_sensor_native_value(self):
-        return parse_incoming_line_count(await self._ssp._device.run_command("34I"))
+    def get_native_value(self, data: SurroundSoundProcessorData):
+        # The line count isn't polled while there's no source, don't show a stale resolution
+        if is_input_source_missing(data):
+            return None
+
+        return format_video_timing(data.input_video_timing)
 
 
 class ExtronHdmiLoopThrough(ExtronSurroundSoundProcessorSensorEntity):
-    def __init__(self, ssp: SurroundSoundProcessor, device_information: DeviceInformation) -> None:
-        super().__init__(ssp, device_information, "HDMI loop thru", "hdmi_loop_thru")
+    query = "\x1b" + "LOUT"
+
+    def __init__(self, coordinator: SurroundSoundProcessorCoordinator, device_information: DeviceInformation) -> None:
+        super().__init__(coordinator, device_information, "HDMI loop thru", "hdmi_loop_thru")
 
         self._attr_device_class = SensorDeviceClass.ENUM
         self._attr_options = ["No audio", "Follow input", "Downmix"]
         self._attr_entity_category = EntityCategory.DIAGNOSTIC
 
-    async def query_sensor_native_value(self):
-        value = await self._ssp._device.run_command("\x1b" + "LOUT")
+    def get_native_value(self, data: SurroundSoundProcessorData):
+        return self._attr_options[data.hdmi_loop_through]
+
+
+class ExtronCommandsSent(ExtronConnectionSensorEntity):
+    def __init__(self, connection: ExtronConnection, device_information: DeviceInformation) -> None:
+        super().__init__(connection, device_information, "commands sent", "commands_sent")
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def get_native_value(self, metrics: ConnectionMetrics):
+        return metrics.commands_sent
+
+
+class ExtronRoundTripTime(ExtronConnectionSensorEntity):
+    def __init__(self, connection: ExtronConnection, device_information: DeviceInformation) -> None:
+        super().__init__(connection, device_information, "average round-trip time", "round_trip_time")
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 1
+
+    def get_native_value(self, metrics: ConnectionMetrics):
+        return metrics.round_trip_time.mean
+
+
+class ExtronTimeouts(ExtronConnectionSensorEntity):
+    def __init__(self, connection: ExtronConnection, device_information: DeviceInformation) -> None:
+        super().__init__(connection, device_information, "timeouts", "timeouts")
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def get_native_value(self, metrics: ConnectionMetrics):
+        return metrics.timeouts
+
+
+class ExtronReconnects(ExtronConnectionSensorEntity):
+    def __init__(self, connection: ExtronConnection, device_information: DeviceInformation) -> None:
+        super().__init__(connection, device_information, "reconnects", "reconnects")
+
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+
+    def get_native_value(self, metrics: ConnectionMetrics):
+        return metrics.reconnects
+
+
+class ExtronRebootRecoveryTime(ExtronConnectionSensorEntity):
+    def __init__(self, connection: ExtronConnection, device_information: DeviceInformation) -> None:
+        super().__init__(connection, device_information, "reboot recovery time", "reboot_recovery_time")
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.SECONDS
+    _attr_suggested_display_precision = 1
+
+    def get_native_value(self, metrics: ConnectionMetrics):
+        return metrics.reboot_recovery_time
+
+
+class ExtronSignalTimeSensorEntity(ExtronSurroundSoundProcessorSensorEntity, RestoreSensor):
+    """Total time a signal has been present, in hours.
+
+    The value is only published when the signal appears or disappears and every few minutes in between, which is
+    enough for the long-term statistics of a total while writing far fewer states. The total survives restarts.
+    """
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_native_unit_of_measurement = UnitOfTime.HOURS
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _attr_suggested_display_precision = 1
+
+    def __init__(
+        self,
+        coordinator: SurroundSoundProcessorCoordinator,
+        device_information: DeviceInformation,
+        name: str,
+        unique_id: str,
+    ) -> None:
+        super().__init__(coordinator, device_information, name, unique_id)
+        self._counter = DurationCounter()
+        self._published_value: float | None = None
+        self._published_at: float | None = None
+
+        self._attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    async def async_added_to_hass(self) -> None:
+        await super().async_added_to_hass()
+
+        last_sensor_data = await self.async_get_last_sensor_data()
+        if last_sensor_data is not None and last_sensor_data.native_value is not None:
+            self._counter = DurationCounter(float(last_sensor_data.native_value) * 3600)
+            self._published_value = float(last_sensor_data.native_value)
+
+    @abstractmethod
+    def is_signal_present(self, data: SurroundSoundProcessorData) -> bool:
+        pass
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        data = self.coordinator.data
+        if data is not None:
+            now = time.monotonic()
+            changed = self._counter.update(self.is_signal_present(data), now)
+
+            if changed or self._published_at is None or now - self._published_at >= DURATION_PUBLISH_INTERVAL_SECONDS:
+                self._published_value = round(self._counter.total(now) / 3600, 3)
+                self._published_at = now
+
+        super()._handle_coordinator_update()
+
+    def get_native_value(self, data: SurroundSoundProcessorData):
+        return self._published_value
+
+
+class ExtronInputSignalTime(ExtronSignalTimeSensorEntity):
+    query = "\x1b" + "IHDCP"
+
+    def __init__(self, coordinator: SurroundSoundProcessorCoordinator, device_information: DeviceInformation) -> None:
+        super().__init__(coordinator, device_information, "input signal time", "input_signal_time")
+
+    def is_signal_present(self, data: SurroundSoundProcessorData) -> bool:
+        return not is_input_source_missing(data)
+
+
+class ExtronOutputSinkTime(ExtronSignalTimeSensorEntity):
+    query = "\x1b" + "OHDCP"
+
+    def __init__(self, coordinator: SurroundSoundProcessorCoordinator, device_information: DeviceInformation) -> None:
+        super().__init__(coordinator, device_information, "output sink time", "output_sink_time")
 
-        return self._attr_options[int(value)]
+    def is_signal_present(self, data: SurroundSoundProcessorData) -> bool:
+        return data.output_hdcp_status is not None and data.output_hdcp_status > 0
@@ -0,0 +1,138 @@
+"""Services that act on several devices at once."""
+
+import asyncio
+import logging
+
+from collections import defaultdict
+from typing import Any
+
+import voluptuous as vol
+
+from homeassistant.components.media_player import (
+    ATTR_INPUT_SOURCE,
+    ATTR_MEDIA_VOLUME_LEVEL,
+    ATTR_MEDIA_VOLUME_MUTED,
+    DOMAIN as MEDIA_PLAYER_DOMAIN,
+)
+from homeassistant.const import ATTR_ENTITY_ID, ENTITY_MATCH_ALL
+from homeassistant.core import HomeAssistant, ServiceCall, ServiceResponse, SupportsResponse
+from homeassistant.exceptions import HomeAssistantError, ServiceValidationError
+from homeassistant.helpers import config_validation as cv, entity_platform
+from homeassistant.helpers.service import async_extract_referenced_entity_ids
+
+from custom_components.extron.broadcast import BroadcastResult, broadcast
+from custom_components.extron.const import (
+    ATTR_MAX_CONCURRENCY,
+    ATTR_TIES,
+    ATTR_TIMEOUT,
+    BROADCAST_MAX_CONCURRENCY,
+    BROADCAST_TIMEOUT_SECONDS,
+    DOMAIN,
+    SERVICE_BROADCAST_SCENE,
+)
+
+logger = logging.getLogger(__name__)
+
+# The fields of a scene, shared by the apply_scene entity service and the broadcast_scene service
+SCENE_SCHEMA = {
+    vol.Optional(ATTR_INPUT_SOURCE): vol.Any(cv.positive_int, cv.string),
+    vol.Optional(ATTR_MEDIA_VOLUME_LEVEL): cv.small_float,
+    vol.Optional(ATTR_MEDIA_VOLUME_MUTED): cv.boolean,
+    vol.Optional(ATTR_TIES): {vol.Coerce(int): vol.Any(cv.positive_int, cv.string)},
+}
+
+BROADCAST_SCENE_SCHEMA = cv.make_entity_service_schema(
+    {
+        **SCENE_SCHEMA,
+        vol.Optional(ATTR_TIMEOUT, default=BROADCAST_TIMEOUT_SECONDS): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1, max=60)
+        ),
+        vol.Optional(ATTR_MAX_CONCURRENCY, default=BROADCAST_MAX_CONCURRENCY): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+    }
+)
+
+
+def async_setup_services(hass: HomeAssistant) -> None:
+    async def async_broadcast_scene(call: ServiceCall) -> ServiceResponse:
+        scene = {key: value for key, value in call.data.items() if key in SCENE_SCHEMA}
+        entities = get_targeted_entities(hass, call)
+        if not entities:
+            raise ServiceValidationError("No Extron media players were targeted")
+
+        # One action per device, the targeted outputs of a matrix switcher are pipelined together
+        entities_by_device: dict[str, list[Any]] = defaultdict(list)
+        for entity in entities:
+            entities_by_device[entity.registry_entry.device_id].append(entity)
+
+        def make_action(device_entities: list[Any]):
+            async def apply_scene() -> None:
+                await asyncio.gather(*[entity.async_apply_scene(**scene) for entity in device_entities])
+
+            return apply_scene
+
+        # Offline devices are reported as failed instead of being left out of the results
+        available_entities_by_device = {
+            device_id: available_entities
+            for device_id, device_entities in entities_by_device.items()
+            if (available_entities := [entity for entity in device_entities if entity.available])
+        }
+        results = {
+            device_id: BroadcastResult(False, 0.0, "Device is unavailable")
+            for device_id in entities_by_device.keys() - available_entities_by_device.keys()
+        }
+        results |= await broadcast(
+            {
+                device_id: make_action(device_entities)
+                for device_id, device_entities in available_entities_by_device.items()
+            },
+            call.data[ATTR_TIMEOUT],
+            call.data[ATTR_MAX_CONCURRENCY],
+        )
+
+        failures = {device_id: result.error for device_id, result in results.items() if not result.success}
+        if failures and not call.return_response:
+            names = ", ".join(entities_by_device[device_id][0].device_info["name"] for device_id in failures)
+            raise HomeAssistantError(f"Applying the scene failed on {len(failures)} of {len(results)} devices: {names}")
+
+        return {
+            "devices": {
+                device_id: {
+                    "name": entities_by_device[device_id][0].device_info["name"],
+                    "success": result.success,
+                    "latency_ms": round(result.latency * 1000, 1),
+                    "error": result.error,
+                }
+                for device_id, result in results.items()
+            }
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_BROADCAST_SCENE,
+        async_broadcast_scene,
+        schema=BROADCAST_SCENE_SCHEMA,
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+
+def get_targeted_entities(hass: HomeAssistant, call: ServiceCall) -> list[Any]:
+    """Like async_extract_entities(), but keeping the unavailable entities"""
+    entities = get_media_player_entities(hass)
+    if call.data.get(ATTR_ENTITY_ID) == ENTITY_MATCH_ALL:
+        return entities
+
+    selected = async_extract_referenced_entity_ids(hass, call)
+    entity_ids = selected.referenced | selected.indirectly_referenced
+
+    return [entity for entity in entities if entity.entity_id in entity_ids]
+
+
+def get_media_player_entities(hass: HomeAssistant) -> list[Any]:
+    return [
+        entity
+        for platform in entity_platform.async_get_platforms(hass, DOMAIN)
+        if platform.domain == MEDIA_PLAYER_DOMAIN
+        for entity in platform.entities.values()
+    ]
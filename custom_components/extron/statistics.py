@@ -0,0 +1,71 @@
+"""Downsampling of polled values before they reach the recorder."""
+
+# The temperature is reported in whole degrees and often flips between two of them, only record larger changes right
+# away. A smaller change is recorded once it has lasted for the hold time.
+TEMPERATURE_DEADBAND = 1
+TEMPERATURE_MAX_HOLD_SECONDS = 900
+# Accumulated durations are published at most this often, the same as the recorder's short-term statistics period
+DURATION_PUBLISH_INTERVAL_SECONDS = 300
+
+
+class Deadband:
+    """Holds the published value until a new value differs from it by more than the deadband.
+
+    A value within the deadband is still published once it has differed from the published value for the maximum
+    hold time, so a sustained small change isn't hidden forever while flipping back and forth never gets through.
+    """
+
+    def __init__(self, deadband: float, max_hold: float) -> None:
+        self._deadband = deadband
+        self._max_hold = max_hold
+        self._differs_since: float | None = None
+        self.value: float | None = None
+
+    def update(self, value: float | None, now: float) -> bool:
+        """Return whether the published value changed"""
+        if value is None or self.value is None:
+            changed = value != self.value
+        elif value == self.value:
+            self._differs_since = None
+            changed = False
+        else:
+            if self._differs_since is None:
+                self._differs_since = now
+            changed = abs(value - self.value) > self._deadband or now - self._differs_since >= self._max_hold
+
+        if changed:
+            self.value = value
+            self._differs_since = None
+
+        return changed
+
+
+class DurationCounter:
+    """Accumulates the time a condition has been true, e.g. how long an input signal has been present"""
+
+    def __init__(self, total: float = 0.0) -> None:
+        self._total = total
+        self._active_since: float | None = None
+
+    @property
+    def active(self) -> bool:
+        return self._active_since is not None
+
+    def total(self, now: float) -> float:
+        if self._active_since is None:
+            return self._total
+
+        return self._total + now - self._active_since
+
+    def update(self, active: bool, now: float) -> bool:
+        """Return whether the condition changed"""
+        if active == self.active:
+            return False
+
+        if active:
+            self._active_since = now
+        else:
+            self._total = self.total(now)
+            self._active_since = None
+
+        return True
@@ -0,0 +1,135 @@
+"""Coalescing of volume changes for surround sound processors."""
+
+import asyncio
+import logging
+
+from collections.abc import Awaitable, Callable
+
+from custom_components.extron.const import VOLUME_DEBOUNCE_SECONDS, VOLUME_RAMP_MAX_COMMANDS_PER_SECOND
+
+logger = logging.getLogger(__name__)
+
+MIN_VOLUME = 0
+MAX_VOLUME = 100
+
+
+def clamp_volume(volume: int) -> int:
+    return max(MIN_VOLUME, min(MAX_VOLUME, volume))
+
+
+def plan_ramp(start: int, target: int, duration: float, max_commands_per_second: float) -> list[int]:
+    """Return the volume levels to send, evenly spread over the duration, ending at the target"""
+    distance = abs(target - start)
+    if distance == 0:
+        return [target]
+
+    num_steps = max(1, min(distance, int(duration * max_commands_per_second)))
+
+    return [round(start + (target - start) * step / num_steps) for step in range(1, num_steps + 1)]
+
+
+class VolumeController:
+    """Turns bursts of volume steps into a single absolute volume command.
+
+    Each step moves a locally tracked target, and the target is sent once no further steps have arrived for the
+    debounce period. Ramps send intermediate levels at a bounded rate. Any new step or ramp supersedes whatever
+    change is still in progress.
+
+    Targets are published before they're sent, so the volume the device last accepted is passed along with each
+    level. That's what to roll back to if the device rejects it.
+    """
+
+    def __init__(
+        self,
+        send_volume: Callable[[int, int | None], Awaitable[None]],
+        debounce: float = VOLUME_DEBOUNCE_SECONDS,
+        max_commands_per_second: float = VOLUME_RAMP_MAX_COMMANDS_PER_SECOND,
+    ) -> None:
+        self._send_volume = send_volume
+        self._debounce = debounce
+        self._max_commands_per_second = max_commands_per_second
+        self._target: int | None = None
+        # The volume the device last accepted, while a change is in progress
+        self._confirmed: int | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def pending_target(self) -> int | None:
+        return self._target
+
+    def step(self, current: int, delta: int) -> int:
+        self._begin(current)
+        base = self._target if self._target is not None else current
+        self._target = clamp_volume(base + delta)
+        self._start(self._send_debounced(self._target))
+
+        return self._target
+
+    async def ramp(self, current: int, target: int, duration: float) -> None:
+        # Steps made during a ramp start from the current level, not from where the ramp was going
+        self._begin(current)
+        self._target = None
+        task = self._start(self._send_ramp(current, clamp_volume(target), duration))
+
+        try:
+            await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # Being superseded by another change is not an error, being cancelled ourselves is
+            if not task.cancelled():
+                raise
+
+    def cancel(self) -> int | None:
+        """Cancel the change in progress and return the volume the device last accepted, if there was one"""
+        confirmed = self._confirmed
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._target = None
+        self._confirmed = None
+
+        return confirmed
+
+    def _begin(self, current: int) -> None:
+        # While a change is in progress the current volume is an unconfirmed target
+        if self._confirmed is None:
+            self._confirmed = current
+
+    def _start(self, coro: Awaitable[None]) -> asyncio.Task:
+        if self._task is not None:
+            self._task.cancel()
+        self._task = asyncio.create_task(coro)
+
+        return self._task
+
+    def _finish(self) -> None:
+        # Superseded tasks must not clear the state of the task that replaced them
+        if self._task is asyncio.current_task():
+            self._task = None
+            self._target = None
+            self._confirmed = None
+
+    async def _send(self, level: int) -> None:
+        await self._send_volume(level, self._confirmed)
+        self._confirmed = level
+
+    async def _send_debounced(self, target: int) -> None:
+        await asyncio.sleep(self._debounce)
+
+        try:
+            await self._send(target)
+        except Exception:
+            logger.exception(f"Unable to set volume level to {target}")
+        finally:
+            self._finish()
+
+    async def _send_ramp(self, start: int, target: int, duration: float) -> None:
+        levels = plan_ramp(start, target, duration, self._max_commands_per_second)
+        interval = duration / len(levels)
+
+        try:
+            for level in levels:
+                await self._send(level)
+                if level != target:
+                    await asyncio.sleep(interval)
+        finally:
+            self._finish()
@@ -0,0 +1,154 @@
+"""End-to-end latency benchmark against simulated devices.
+
+Run from the repository root, e.g. python -m tests.benchmark --devices 20 --rtt 0.02 --jitter 0.01
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+
+from dataclasses import dataclass
+
+from pyextron import DeviceType, ExtronDevice
+
+from custom_components.extron import query_device_information
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.const import FLEET_MAX_CONCURRENT_SESSIONS, VERBOSE_MODE
+from custom_components.extron.coordinator import SURROUND_SOUND_PROCESSOR_QUERIES
+from tests.simulator import ExtronSimulator
+
+
+@dataclass
+class BenchmarkResult:
+    num_devices: int
+    setup_time: float
+    poll_cycles: int
+    connections_per_poll_cycle: float
+    poll_latencies: list[float]
+    command_latencies: list[float]
+
+
+def percentile(values: list[float], percent: float) -> float:
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(percent / 100 * len(ordered)) - 1))
+
+    return ordered[index]
+
+
+async def timed(coro) -> float:
+    start = time.monotonic()
+    await coro
+
+    return time.monotonic() - start
+
+
+async def set_up_device(simulator: ExtronSimulator, limiter: asyncio.Semaphore) -> ExtronConnection:
+    """Does what setting up a config entry does: connect, query device information and the initial state"""
+    device = ExtronDevice("127.0.0.1", simulator.port, simulator.password)
+    connection = ExtronConnection(device, verbose_mode=VERBOSE_MODE, limiter=limiter)
+    await connection.connect()
+    await query_device_information(connection, DeviceType.SURROUND_SOUND_PROCESSOR.value)
+    await connection.run_commands(list(SURROUND_SOUND_PROCESSOR_QUERIES), background=True)
+
+    return connection
+
+
+async def run_benchmark(
+    num_devices: int,
+    rtt: float,
+    jitter: float,
+    poll_cycles: int,
+    max_connections: int | None = None,
+    max_concurrent_sessions: int = FLEET_MAX_CONCURRENT_SESSIONS,
+) -> BenchmarkResult:
+    # All devices share one limiter, like the config entries share the fleet
+    limiter = asyncio.Semaphore(max_concurrent_sessions)
+    simulators = [ExtronSimulator(rtt=rtt, jitter=jitter, max_connections=max_connections) for _ in range(num_devices)]
+    for simulator in simulators:
+        await simulator.start()
+
+    try:
+        start = time.monotonic()
+        connections = await asyncio.gather(*[set_up_device(simulator, limiter) for simulator in simulators])
+        setup_time = time.monotonic() - start
+        connections_after_setup = sum(simulator.connections_total for simulator in simulators)
+
+        poll_latencies = []
+        command_latencies = []
+        for cycle in range(poll_cycles):
+            poll_latencies += await asyncio.gather(
+                *[
+                    timed(connection.run_commands(list(SURROUND_SOUND_PROCESSOR_QUERIES), background=True))
+                    for connection in connections
+                ]
+            )
+            command_latencies += await asyncio.gather(
+                *[timed(connection.run_command(f"{cycle % 5 + 1}$")) for connection in connections]
+            )
+
+        connections_during_polling = (
+            sum(simulator.connections_total for simulator in simulators) - connections_after_setup
+        )
+
+        for connection in connections:
+            await connection.close()
+    finally:
+        for simulator in simulators:
+            await simulator.close()
+
+    return BenchmarkResult(
+        num_devices=num_devices,
+        setup_time=setup_time,
+        poll_cycles=poll_cycles,
+        connections_per_poll_cycle=connections_during_polling / poll_cycles,
+        poll_latencies=poll_latencies,
+        command_latencies=command_latencies,
+    )
+
+
+def format_latencies(latencies: list[float]) -> str:
+    return (
+        f"p50 {percentile(latencies, 50) * 1000:.1f} ms, p99 {percentile(latencies, 99) * 1000:.1f} ms, "
+        f"mean {statistics.mean(latencies) * 1000:.1f} ms"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--devices", type=int, default=10, help="number of simulated devices")
+    parser.add_argument("--rtt", type=float, default=0.02, help="round-trip time of the simulated devices in seconds")
+    parser.add_argument("--jitter", type=float, default=0.005, help="maximum random extra delay in seconds")
+    parser.add_argument("--cycles", type=int, default=20, help="number of poll cycles")
+    parser.add_argument("--max-connections", type=int, help="simultaneous connections allowed per device")
+    parser.add_argument(
+        "--max-concurrent-sessions",
+        type=int,
+        default=FLEET_MAX_CONCURRENT_SESSIONS,
+        help="devices allowed to connect or poll at the same time",
+    )
+    parser.add_argument("--max-p99", type=float, help="fail if the p99 poll latency exceeds this many seconds")
+    args = parser.parse_args()
+
+    result = asyncio.run(
+        run_benchmark(
+            args.devices, args.rtt, args.jitter, args.cycles, args.max_connections, args.max_concurrent_sessions
+        )
+    )
+
+    print(f"Devices: {result.num_devices}, poll cycles: {result.poll_cycles}")
+    print(f"Setup time: {result.setup_time * 1000:.1f} ms")
+    print(f"New connections per poll cycle: {result.connections_per_poll_cycle:.2f}")
+    print(f"Poll latency: {format_latencies(result.poll_latencies)}")
+    print(f"Command latency: {format_latencies(result.command_latencies)}")
+
+    if args.max_p99 is not None and percentile(result.poll_latencies, 99) > args.max_p99:
+        print(f"p99 poll latency exceeds {args.max_p99 * 1000:.1f} ms", file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
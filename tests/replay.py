@@ -0,0 +1,117 @@
+"""Replay of a recorded traffic trace against a local stand-in for the recorded device.
+
+The requests in the trace are made again at their recorded times, divided by the speed, and answered with the recorded
+responses after the recorded round-trip times. The latencies are compared with the recorded ones, scaled back to the
+original speed. Traces are recorded with the "record traffic" option of the integration.
+
+Run from the repository root, e.g. python -m tests.replay extron_traces/<entry id>.jsonl --speed 10
+"""
+
+import argparse
+import asyncio
+import sys
+
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from pyextron import ExtronDevice
+
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.recorder import read_trace
+from tests.benchmark import format_latencies, timed
+from tests.simulator import ExtronSimulator
+
+
+@dataclass
+class ReplayResult:
+    num_requests: int
+    failed_requests: int
+    recorded_latencies: list[float]
+    replayed_latencies: list[float]
+
+
+class ReplayServer(ExtronSimulator):
+    """Answers each command with the next response recorded for it, after the recorded round-trip time.
+
+    Commands that weren't recorded, or are sent more often than they were, are answered by the simulator.
+    """
+
+    def __init__(self, trace: list[dict[str, Any]], speed: float) -> None:
+        super().__init__()
+        self._speed = speed
+        self._responses: dict[str, deque[tuple[str, float]]] = defaultdict(deque)
+        self._next_delay = 0.0
+
+        for event in trace:
+            if event["event"] == "response":
+                self._responses[event["command"]].append((event["response"], event["rtt_ms"] / 1000))
+
+    def _get_response_delay(self, command: str) -> float:
+        return self._next_delay
+
+    def _handle_command(self, command: str, writer: asyncio.StreamWriter) -> str:
+        recorded = self._responses.get(command)
+        if not recorded:
+            self._next_delay = self.rtt
+            return super()._handle_command(command, writer)
+
+        response, round_trip_time = recorded.popleft()
+        self._next_delay = round_trip_time / self._speed
+
+        return response
+
+
+async def replay(trace: list[dict[str, Any]], speed: float) -> ReplayResult:
+    requests = [event for event in trace if event["event"] == "request"]
+
+    server = ReplayServer(trace, speed)
+    await server.start()
+    connection = ExtronConnection(ExtronDevice("127.0.0.1", server.port, server.password))
+    await connection.connect()
+
+    loop = asyncio.get_running_loop()
+    started_at = loop.time()
+    tasks = []
+
+    try:
+        for request in requests:
+            # Requests are recorded when they complete
+            requested_at = request["t"] - request["latency_ms"] / 1000
+            await asyncio.sleep(max(0.0, started_at + requested_at / speed - loop.time()))
+            coro = connection.run_commands(request["commands"], background=request["background"])
+            tasks.append(asyncio.create_task(timed(coro)))
+
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await connection.close()
+        await server.close()
+
+    return ReplayResult(
+        num_requests=len(requests),
+        failed_requests=sum(isinstance(result, Exception) for result in results),
+        recorded_latencies=[request["latency_ms"] / 1000 for request in requests if request["error"] is None],
+        replayed_latencies=[result * speed for result in results if not isinstance(result, Exception)],
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", type=Path, help="trace recorded by the integration")
+    parser.add_argument("--speed", type=float, default=1.0, help="how many times faster than recorded to replay")
+    args = parser.parse_args()
+
+    result = asyncio.run(replay(read_trace(args.trace), args.speed))
+
+    print(f"Requests: {result.num_requests}, failed when replayed: {result.failed_requests}")
+    if result.recorded_latencies:
+        print(f"Recorded latency: {format_latencies(result.recorded_latencies)}")
+    if result.replayed_latencies:
+        print(f"Replayed latency: {format_latencies(result.replayed_latencies)}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""A stand-in for Extron devices, speaking the subset of SIS used by the integration."""
+
+import asyncio
+import random
+import re
+
+from dataclasses import dataclass, field
+
+TAGGED_COMMAND_PATTERN = re.compile(r"^(\d+)([$!VZ])$")
+VERBOSE_MODE_COMMAND_PATTERN = re.compile(r"^\x1b(\d)CV$")
+TIE_COMMAND_PATTERN = re.compile(r"^(\d+)\*(\d+)!$")
+TIE_TABLE_QUERY_PATTERN = re.compile(r"^\x1b0\*(\d+)\*1VC$")
+
+
+@dataclass
+class SimulatedDeviceState:
+    model_name: str = "SSP 200"
+    part_number: str = "60-1055-01"
+    firmware_version: str = "1.04.0001"
+    mac_address: str = "00-05-A6-12-34-56"
+    ip_address: str = "192.168.1.10"
+    input: int = 1
+    volume: int = 40
+    muted: bool = False
+    temperature: int = 45
+    input_line_count: str = "2160*30.002735*67.485909*3840"
+    hdmi_loop_through: int = 1
+    input_hdcp_status: int = 1
+    output_hdcp_status: int = 1
+    # Matrix switchers only
+    num_inputs: int = 8
+    ties: list[int] = field(default_factory=lambda: [1] * 8)
+
+
+class ExtronSimulator:
+    """An asyncio TCP server that behaves like an Extron device.
+
+    Responses are delayed by the configured round-trip time plus a random jitter, while keeping them in order.
+    Connections beyond max_connections are closed right away, like a device that has run out of sessions.
+    """
+
+    def __init__(
+        self,
+        password: str = "extron",
+        state: SimulatedDeviceState | None = None,
+        rtt: float = 0.0,
+        jitter: float = 0.0,
+        max_connections: int | None = None,
+        reboot_duration: float = 1.0,
+        acknowledge_reboot: bool = True,
+    ) -> None:
+        self.password = password
+        self.state = state or SimulatedDeviceState()
+        self.rtt = rtt
+        self.jitter = jitter
+        self.max_connections = max_connections
+        self.reboot_duration = reboot_duration
+        # Some devices drop the connection before answering the reboot command
+        self.acknowledge_reboot = acknowledge_reboot
+        self.connections_total = 0
+        self.connections_refused = 0
+        self.commands_received: list[str] = []
+        # A hung device still accepts connections and logins, but never answers commands
+        self.responding = True
+        self._server: asyncio.Server | None = None
+        self._verbose_modes: dict[asyncio.StreamWriter, int] = {}
+        self._handlers: set[asyncio.Task] = set()
+        self._rebooting_until = 0.0
+
+    @property
+    def port(self) -> int:
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def active_connections(self) -> int:
+        return len(self._verbose_modes)
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> None:
+        self._server = await asyncio.start_server(self._handle_connection, host, port)
+
+    async def close(self) -> None:
+        self._server.close()
+        self.drop_connections()
+
+        # Closed connections end their handlers, wait for that so that no tasks outlive the simulator
+        await asyncio.gather(*self._handlers)
+        await self._server.wait_closed()
+
+    def drop_connections(self) -> None:
+        for writer in list(self._verbose_modes):
+            writer.close()
+        self._verbose_modes.clear()
+
+    def press_front_panel_input(self, input_number: int) -> None:
+        """Change the input like someone pressing a button on the device would"""
+        self.state.input = input_number
+        self._notify(f"In{input_number} All")
+
+    def press_front_panel_tie(self, input_number: int, output: int) -> None:
+        self.state.ties[output - 1] = input_number
+        self._notify(f"Out{output:02} In{input_number:02} All")
+
+    def set_input_hdcp_status(self, status: int) -> None:
+        self.state.input_hdcp_status = status
+        self._notify(f"HdcpI{status}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+        if loop.time() < self._rebooting_until or (
+            self.max_connections is not None and self.active_connections >= self.max_connections
+        ):
+            self.connections_refused += 1
+            writer.close()
+            return
+
+        self.connections_total += 1
+        self._handlers.add(asyncio.current_task())
+        self._verbose_modes[writer] = 0
+
+        try:
+            await self._login(reader, writer)
+            send_at = 0.0
+
+            while True:
+                command = (await reader.readuntil(b"\n")).decode().strip("\r\n")
+                self.commands_received.append(command)
+                if not self.responding:
+                    continue
+
+                if command == "\x1b" + "1BOOT" and not self.acknowledge_reboot:
+                    self._reboot()
+                    continue
+
+                response = self._handle_command(command, writer)
+
+                # Delay responses without letting the jitter reorder them
+                send_at = max(loop.time() + self._get_response_delay(command), send_at)
+                loop.call_at(send_at, self._write_line, writer, response)
+
+                if command == "\x1b" + "1BOOT":
+                    loop.call_at(send_at, self._reboot)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._verbose_modes.pop(writer, None)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _login(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        writer.write(f"(c) Copyright 2024, Extron Electronics, {self.state.model_name}\r\n".encode())
+
+        while True:
+            writer.write(b"Password:")
+            await writer.drain()
+
+            password = (await reader.readuntil(b"\r")).decode().strip()
+            if password == self.password:
+                writer.write(b"\r\nLogin Administrator\r\n")
+                await writer.drain()
+                return
+
+    def _get_response_delay(self, command: str) -> float:
+        return self.rtt + random.uniform(0, self.jitter)
+
+    def _handle_command(self, command: str, writer: asyncio.StreamWriter) -> str:
+        state = self.state
+        queries = {
+            "$": str(state.input),
+            "!": str(state.input),
+            "V": str(state.volume),
+            "Z": "1" if state.muted else "0",
+            "Q": state.firmware_version.rsplit(".", 1)[0],
+            "*Q": state.firmware_version,
+            "N": state.part_number,
+            "1I": state.model_name,
+            "34I": state.input_line_count,
+            "I": f"V{state.num_inputs}X{len(state.ties)} A{state.num_inputs}X{len(state.ties)}",
+            "\x1b" + "CH": state.mac_address,
+            "\x1b" + "CI": state.ip_address,
+            "\x1b" + "20STAT": str(state.temperature),
+            "\x1b" + "LOUT": str(state.hdmi_loop_through),
+            "\x1b" + "IHDCP": str(state.input_hdcp_status),
+            "\x1b" + "OHDCP": str(state.output_hdcp_status),
+            "\x1b" + "1BOOT": "Boot1",
+        }
+        if command in queries:
+            return queries[command]
+
+        if command in ("+V", "-V"):
+            return self._set_volume(state.volume + (1 if command == "+V" else -1), writer)
+
+        match = TAGGED_COMMAND_PATTERN.match(command)
+        if match:
+            value, kind = int(match.group(1)), match.group(2)
+            if kind in "$!":
+                state.input = value
+                return self._broadcast(f"In{value} All", writer)
+            if kind == "V":
+                return self._set_volume(value, writer)
+            if kind == "Z" and value in (0, 1):
+                state.muted = value == 1
+                return self._broadcast(f"Amt{value}", writer)
+
+        match = TIE_COMMAND_PATTERN.match(command)
+        if match:
+            input_number, output = int(match.group(1)), int(match.group(2))
+            if input_number > state.num_inputs or not 1 <= output <= len(state.ties):
+                return "E01"
+            state.ties[output - 1] = input_number
+            return self._broadcast(f"Out{output:02} In{input_number:02} All", writer)
+
+        match = TIE_TABLE_QUERY_PATTERN.match(command)
+        if match:
+            first_output = int(match.group(1))
+            chunk = state.ties[first_output - 1 : first_output - 1 + 16]
+            return " ".join(f"{input_number:02}" for input_number in chunk) + " Vid"
+
+        match = VERBOSE_MODE_COMMAND_PATTERN.match(command)
+        if match:
+            self._verbose_modes[writer] = int(match.group(1))
+            return f"Vrb{match.group(1)}"
+
+        return "E10"
+
+    def _set_volume(self, volume: int, writer: asyncio.StreamWriter) -> str:
+        self.state.volume = max(0, min(100, volume))
+        return self._broadcast(f"Vol{self.state.volume}", writer)
+
+    def _broadcast(self, message: str, origin: asyncio.StreamWriter) -> str:
+        # The connection that made the change gets the message as its response, others are notified
+        self._notify(message, exclude=origin)
+        return message
+
+    def _notify(self, message: str, exclude: asyncio.StreamWriter | None = None) -> None:
+        for writer, verbose_mode in self._verbose_modes.items():
+            if writer is not exclude and verbose_mode in (1, 3):
+                self._write_line(writer, message)
+
+    def _reboot(self) -> None:
+        self._rebooting_until = asyncio.get_running_loop().time() + self.reboot_duration
+        self.drop_connections()
+
+    @staticmethod
+    def _write_line(writer: asyncio.StreamWriter, line: str) -> None:
+        if not writer.is_closing():
+            writer.write(f"{line}\r\n".encode())
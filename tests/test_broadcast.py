@@ -0,0 +1,81 @@
+import asyncio
+import time
+
+from unittest import IsolatedAsyncioTestCase
+
+from pyextron import ExtronDevice
+
+from custom_components.extron.broadcast import broadcast
+from custom_components.extron.connection import ExtronConnection
+from tests.simulator import ExtronSimulator
+
+
+class TestBroadcast(IsolatedAsyncioTestCase):
+    async def test_results_per_device(self):
+        async def succeed():
+            await asyncio.sleep(0.01)
+
+        async def fail():
+            raise ConnectionError("Connection refused")
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        results = await broadcast({"a": succeed, "b": fail, "c": hang}, timeout=0.1, max_concurrency=10)
+
+        self.assertTrue(results["a"].success)
+        self.assertGreaterEqual(results["a"].latency, 0.01)
+        self.assertEqual((False, "Connection refused"), (results["b"].success, results["b"].error))
+        self.assertFalse(results["c"].success)
+        self.assertIn("Timed out", results["c"].error)
+        self.assertLess(results["c"].latency, 1)
+
+    async def test_concurrency_is_bounded(self):
+        running = 0
+        max_running = 0
+
+        async def action():
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        results = await broadcast({str(i): action for i in range(10)}, timeout=1, max_concurrency=3)
+
+        self.assertEqual(3, max_running)
+        self.assertTrue(all(result.success for result in results.values()))
+
+    async def test_takes_about_one_round_trip(self):
+        simulators = [ExtronSimulator(rtt=0.05) for _ in range(30)]
+        connections = []
+        for simulator in simulators:
+            await simulator.start()
+            connection = ExtronConnection(ExtronDevice("127.0.0.1", simulator.port, simulator.password))
+            await connection.connect()
+            connections.append(connection)
+
+        def make_action(connection: ExtronConnection):
+            async def mute():
+                await connection.run_command("1Z")
+
+            return mute
+
+        try:
+            start = time.perf_counter()
+            results = await broadcast(
+                {str(i): make_action(connection) for i, connection in enumerate(connections)},
+                timeout=1,
+                max_concurrency=32,
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            for connection in connections:
+                await connection.close()
+            for simulator in simulators:
+                await simulator.close()
+
+        self.assertTrue(all(result.success for result in results.values()))
+        self.assertTrue(all(simulator.state.muted for simulator in simulators))
+        # Sequentially this would take 30 round trips
+        self.assertLess(elapsed, 0.05 * 5)
@@ -0,0 +1,98 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase
+
+from custom_components.extron.cache import ResponseCache
+
+
+class TestResponseCache(IsolatedAsyncioTestCase):
+    async def test_concurrent_queries_are_coalesced(self):
+        cache = ResponseCache(ttl=10)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "1"
+
+        results = await asyncio.gather(cache.get("Z", fetch), cache.get("Z", fetch), cache.get("Z", fetch))
+        self.assertEqual(["1", "1", "1"], results)
+        self.assertEqual(1, calls)
+
+        # Subsequent queries are served from the cache
+        self.assertEqual("1", await cache.get("Z", fetch))
+        self.assertEqual(1, calls)
+        self.assertEqual(3, cache.hits)
+        self.assertEqual(1, cache.misses)
+
+    async def test_invalidate(self):
+        cache = ResponseCache(ttl=10)
+        responses = iter(["1", "2"])
+
+        async def fetch():
+            return next(responses)
+
+        self.assertEqual("1", await cache.get("$", fetch))
+        cache.invalidate()
+        self.assertEqual("2", await cache.get("$", fetch))
+
+    async def test_errors_are_not_cached(self):
+        cache = ResponseCache(ttl=10)
+
+        async def failing_fetch():
+            raise ConnectionError()
+
+        async def fetch():
+            return "3"
+
+        with self.assertRaises(ConnectionError):
+            await cache.get("V", failing_fetch)
+        self.assertEqual("3", await cache.get("V", fetch))
+
+    async def test_cancelling_first_caller_leaves_others_waiting(self):
+        cache = ResponseCache(ttl=10)
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "1"
+
+        first = asyncio.create_task(cache.get("Z", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(cache.get("Z", fetch))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.gather(first, second, return_exceptions=True)
+
+        # Only the cancelled caller stopped waiting, the query still answered the other one
+        self.assertTrue(first.cancelled())
+        self.assertEqual("1", second.result())
+        self.assertEqual(1, calls)
+
+        # The response is cached even though the caller that fetched it went away
+        self.assertEqual("1", await cache.get("Z", fetch))
+        self.assertEqual(1, calls)
+
+    async def test_get_many_only_fetches_missing(self):
+        cache = ResponseCache(ttl=10)
+        fetched: list[list[str]] = []
+
+        async def fetch(keys):
+            fetched.append(keys)
+            await asyncio.sleep(0.01)
+            return [f"{key}!" for key in keys]
+
+        await cache.get_many(["$"], fetch)
+        fetched.clear()
+
+        # A cached key and one in flight aren't fetched again, the rest is fetched in one batch
+        in_flight = asyncio.create_task(cache.get_many(["V"], fetch))
+        await asyncio.sleep(0)
+        self.assertEqual(["$!", "V!", "Z!", "Z!"], await cache.get_many(["$", "V", "Z", "Z"], fetch))
+        await in_flight
+
+        self.assertEqual([["V"], ["Z"]], fetched)
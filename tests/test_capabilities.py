@@ -0,0 +1,56 @@
+from unittest import TestCase
+
+from custom_components.extron.capabilities import CAPABILITY_REGISTRY, CapabilityRegistry, parse_command
+
+REGISTRY = {
+    "device_types": {
+        "hdmi_switcher": {"inputs": 8, "outputs": 1, "verbose_mode": True, "commands": ["!", "Esc1BOOT"]},
+        "matrix_switcher": {"inputs": None, "outputs": None, "verbose_mode": True, "commands": ["I"]},
+    },
+    "models": {
+        "SW4": {"device_type": "hdmi_switcher", "inputs": 4},
+        "SW4 HD 4K PLUS": {"device_type": "hdmi_switcher", "inputs": 4, "verbose_mode": False},
+        "DXP 84": {"device_type": "matrix_switcher", "inputs": 8, "outputs": 4, "part_numbers": ["60-1494-01"]},
+    },
+}
+
+
+class TestCapabilities(TestCase):
+    def setUp(self):
+        self.registry = CapabilityRegistry(REGISTRY)
+
+    def test_parse_command(self):
+        self.assertEqual("\x1b" + "1BOOT", parse_command("Esc1BOOT"))
+        self.assertEqual("$", parse_command("$"))
+
+    def test_find_model_by_longest_prefix(self):
+        self.assertEqual(4, self.registry.find_model("sw4 hd 4k").num_inputs)
+        self.assertTrue(self.registry.find_model("SW4 HD 4K").verbose_mode)
+        self.assertFalse(self.registry.find_model("SW4 HD 4K PLUS").verbose_mode)
+        self.assertIsNone(self.registry.find_model("SSP 200"))
+
+    def test_find_model_by_part_number(self):
+        capabilities = self.registry.find_model("Unknown name", "60-1494-01")
+        self.assertEqual((8, 4), (capabilities.num_inputs, capabilities.num_outputs))
+
+    def test_models_inherit_device_type_defaults(self):
+        capabilities = self.registry.find_model("SW4 HD 4K")
+        self.assertTrue(capabilities.supports("!"))
+        self.assertTrue(capabilities.supports("\x1b" + "1BOOT"))
+        self.assertFalse(capabilities.supports("\x1b" + "IHDCP"))
+        self.assertEqual(1, capabilities.num_outputs)
+
+    def test_lookup_falls_back_to_device_type(self):
+        capabilities = self.registry.lookup("hdmi_switcher", "SW12 HD")
+        self.assertEqual(8, capabilities.num_inputs)
+
+        # The configured device type wins over a model of another type
+        capabilities = self.registry.lookup("hdmi_switcher", "DXP 84 HD 4K")
+        self.assertEqual("hdmi_switcher", capabilities.device_type)
+        self.assertEqual(8, capabilities.num_inputs)
+
+    def test_bundled_registry(self):
+        capabilities = CAPABILITY_REGISTRY.lookup("surround_sound_processor", "SSP 200")
+        self.assertTrue(capabilities.supports("\x1b" + "IHDCP"))
+        self.assertEqual(5, capabilities.num_inputs)
+        self.assertEqual(2, CAPABILITY_REGISTRY.lookup("hdmi_switcher", "SW2 HD 4K").num_inputs)
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+from custom_components.extron.codec import LineFramer, VideoTiming, decode_response, parse_video_timing
+
+
+class TestLineFramer(TestCase):
+    def test_lines_split_across_reads(self):
+        framer = LineFramer()
+
+        self.assertEqual([], framer.feed(b"In3 A"))
+        self.assertEqual([], framer.feed(b"ll\r"))
+        self.assertEqual(["In3 All"], framer.feed(b"\n"))
+
+    def test_multiple_lines_in_one_read(self):
+        framer = LineFramer()
+
+        self.assertEqual(["1", "0", "40"], framer.feed(b"1\r\n0\r\n40\r\n4"))
+        self.assertEqual(["45", ""], framer.feed(b"5\r\n\r\n"))
+
+    def test_overlong_line(self):
+        framer = LineFramer(max_line_length=8)
+
+        with self.assertRaises(ValueError):
+            framer.feed(b"0123456789")
+
+
+class TestDecoding(TestCase):
+    def test_parse_video_timing(self):
+        self.assertEqual(
+            VideoTiming(lines=2160, vertical_frequency=30.002735, horizontal_frequency=67.485909, pixels=3840),
+            parse_video_timing("2160*30.002735*67.485909*3840"),
+        )
+
+        with self.assertRaises(ValueError):
+            parse_video_timing("0")
+
+    def test_decode_response(self):
+        self.assertEqual(3, decode_response("$", "3"))
+        self.assertTrue(decode_response("Z", "1"))
+        self.assertFalse(decode_response("Z", "0"))
+        self.assertEqual(2, decode_response("\x1b" + "IHDCP", "2"))
+        self.assertEqual((8, 4), decode_response("I", "V8X4 A8X4"))
+
+        with self.assertRaises(ValueError):
+            decode_response("V", "Vol40")
+        with self.assertRaises(ValueError):
+            decode_response("unknown", "1")
@@ -0,0 +1,228 @@
+import asyncio
+import time
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from pyextron import ExtronDevice
+
+from custom_components.extron.connection import (
+    CircuitBreaker,
+    CircuitOpenError,
+    ExtronConnection,
+    ResponseError,
+    calculate_backoff,
+)
+from tests.simulator import ExtronSimulator
+
+QUERIES = ["$", "Z", "V", "\x1b" + "20STAT", "34I", "\x1b" + "LOUT", "\x1b" + "IHDCP", "\x1b" + "OHDCP"]
+
+
+class TestConnection(TestCase):
+    def test_calculate_backoff(self):
+        self.assertEqual(1, calculate_backoff(0, 1, 60))
+        self.assertEqual(2, calculate_backoff(1, 1, 60))
+        self.assertEqual(32, calculate_backoff(5, 1, 60))
+
+        # The delay is capped
+        self.assertEqual(60, calculate_backoff(6, 1, 60))
+        self.assertEqual(60, calculate_backoff(100, 1, 60))
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(threshold=3, probe_backoff_initial=5, probe_backoff_max=300)
+
+        self.assertFalse(breaker.record_failure())
+        self.assertFalse(breaker.record_failure())
+        self.assertFalse(breaker.is_open)
+        self.assertTrue(breaker.record_failure())
+        self.assertTrue(breaker.is_open)
+        self.assertEqual(5, breaker.probe_delay)
+
+        # Failed probes back off
+        self.assertFalse(breaker.record_failure())
+        self.assertEqual(10, breaker.probe_delay)
+
+        self.assertTrue(breaker.record_success())
+        self.assertFalse(breaker.is_open)
+        self.assertFalse(breaker.record_success())
+
+
+class TestConnectionWithSimulator(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.simulator = ExtronSimulator(rtt=0.05)
+        await self.simulator.start()
+
+    async def asyncTearDown(self):
+        await self.connection.close()
+        await self.simulator.close()
+
+    async def connect(self, **kwargs) -> ExtronConnection:
+        device = ExtronDevice("127.0.0.1", self.simulator.port, self.simulator.password)
+        self.connection = ExtronConnection(device, timeout=2, **kwargs)
+        await self.connection.connect()
+
+        return self.connection
+
+    async def test_polls_share_one_connection(self):
+        connection = await self.connect()
+
+        for _ in range(5):
+            responses = await connection.run_commands(QUERIES)
+            self.assertEqual(["1", "0", "40", "45"], responses[:4])
+
+        self.assertEqual(1, self.simulator.connections_total)
+        self.assertEqual(1, connection.metrics.connects)
+        # Polls repeated within the cache TTL don't reach the device
+        self.assertEqual(len(QUERIES), connection.metrics.commands_sent)
+        self.assertEqual(4 * len(QUERIES), connection.response_cache.hits)
+
+    async def test_batches_are_pipelined(self):
+        connection = await self.connect()
+
+        start = time.monotonic()
+        await connection.run_commands(QUERIES)
+        elapsed = time.monotonic() - start
+
+        # Sending the queries one by one would take one round trip each
+        self.assertLess(elapsed, 3 * self.simulator.rtt)
+
+    async def test_commands_and_errors(self):
+        connection = await self.connect()
+
+        self.assertEqual("In3 All", await connection.run_command("3$"))
+        self.assertEqual("Vol100", await connection.run_command("120V"))
+        with self.assertRaises(ResponseError):
+            await connection.run_command("invalid")
+
+        # The connection is still usable after an error response
+        self.assertEqual(["3", "100"], await connection.run_commands(["$", "V"]))
+        self.assertEqual(1, connection.metrics.error_responses)
+
+    async def test_notifications(self):
+        connection = await self.connect(verbose_mode=1)
+        notifications = asyncio.Queue()
+        connection.add_notification_listener(notifications.put_nowait)
+
+        # Make sure the verbose mode has been applied before pressing buttons
+        await connection.run_command("Q")
+        self.simulator.press_front_panel_input(4)
+
+        notification = await asyncio.wait_for(notifications.get(), timeout=1)
+        self.assertEqual(("input", 4), (notification.name, notification.value))
+
+    async def test_circuit_breaker_fails_fast_until_device_recovers(self):
+        connection = await self.connect()
+        connection._timeout = 0.2
+        connection.circuit_breaker = CircuitBreaker(threshold=2, probe_backoff_initial=0.1, probe_backoff_max=0.2)
+        self.simulator.responding = False
+
+        for _ in range(2):
+            await connection.wait_connected()
+            with self.assertRaises(TimeoutError):
+                await connection.run_command("Q")
+
+        # Commands no longer wait for the timeout
+        start = time.monotonic()
+        with self.assertRaises(CircuitOpenError):
+            await connection.run_commands(QUERIES)
+        self.assertLess(time.monotonic() - start, 0.1)
+        self.assertEqual(1, connection.metrics.circuit_breaker_trips)
+
+        # The probe closes the circuit once the device answers again
+        self.simulator.responding = True
+        async with asyncio.timeout(5):
+            while connection.circuit_breaker.is_open:
+                await asyncio.sleep(0.05)
+
+        self.assertEqual("1", await connection.run_command("$"))
+
+    async def test_interactive_commands_preempt_background_queries(self):
+        connection = await self.connect()
+
+        poll = asyncio.create_task(connection.run_commands(QUERIES, background=True))
+        await asyncio.sleep(0.01)
+
+        start = time.monotonic()
+        self.assertEqual("In3 All", await connection.run_command("3$"))
+        elapsed = time.monotonic() - start
+
+        # Only the queries already in flight are answered first, not the whole poll
+        self.assertFalse(poll.done())
+        self.assertLess(elapsed, 1.5 * self.simulator.rtt)
+        self.assertEqual(len(QUERIES), len(await poll))
+
+    async def test_queued_background_queries_are_shared(self):
+        connection = await self.connect()
+
+        first, second = await asyncio.gather(
+            connection.run_commands(QUERIES, background=True),
+            connection.run_commands(QUERIES, background=True),
+        )
+
+        self.assertEqual(first, second)
+        # The first queries were already in flight when the second batch was queued
+        self.assertLess(len(self.simulator.commands_received), 2 * len(QUERIES))
+
+    async def test_cancelled_poll_leaves_shared_queries_to_others(self):
+        connection = await self.connect()
+
+        first = asyncio.create_task(connection.run_commands(QUERIES, background=True))
+        await asyncio.sleep(0.01)
+        # The second poll isn't served by the cache, it shares the queries still queued for the first one
+        connection.response_cache.invalidate()
+        second = asyncio.create_task(connection.run_commands(QUERIES, background=True))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        responses = await second
+
+        self.assertTrue(first.cancelled())
+        self.assertEqual(["1", "0", "40", "45"], responses[:4])
+
+    async def test_cancelled_batch_leaves_shared_commands_to_others(self):
+        connection = await self.connect()
+        # Commands that aren't cached, so the batches reach the queue directly
+        commands = ["1$", "2$", "3$", "4$", "5$", "1Z", "0Z", "40V"]
+
+        first = asyncio.create_task(connection.run_commands(commands, background=True))
+        await asyncio.sleep(0.01)
+        second = asyncio.create_task(connection.run_commands(commands, background=True))
+        await asyncio.sleep(0.01)
+
+        first.cancel()
+        responses = await second
+
+        self.assertTrue(first.cancelled())
+        self.assertEqual(len(commands), len(responses))
+        self.assertEqual("In5 All", responses[4])
+
+    async def test_reconnects_quickly_after_reboot(self):
+        self.simulator.reboot_duration = 0.5
+        connection = await self.connect()
+
+        await connection.reboot()
+        self.assertTrue(connection.is_rebooting)
+        self.assertFalse(connection.is_connected())
+
+        await asyncio.wait_for(connection.wait_connected(), timeout=5)
+        self.assertFalse(connection.is_rebooting)
+        self.assertEqual("1", await connection.run_command("$"))
+
+        # The expected disconnect isn't a failure
+        self.assertEqual(0, connection.metrics.connection_losses)
+        self.assertEqual(0, connection.circuit_breaker.consecutive_failures)
+        self.assertEqual(1, connection.metrics.reboots)
+        self.assertGreaterEqual(connection.metrics.reboot_recovery_time, 0.5)
+
+    async def test_reboot_without_acknowledgement(self):
+        self.simulator.reboot_duration = 0.5
+        self.simulator.acknowledge_reboot = False
+        connection = await self.connect()
+
+        # The connection drops before the command is answered, the device is rebooting nonetheless
+        await connection.reboot()
+        self.assertTrue(connection.is_rebooting)
+
+        await asyncio.wait_for(connection.wait_connected(), timeout=5)
+        self.assertFalse(connection.is_rebooting)
+        self.assertEqual(0, connection.metrics.connection_losses)
+        self.assertEqual(1, connection.metrics.reboots)
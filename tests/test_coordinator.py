@@ -0,0 +1,86 @@
+from dataclasses import dataclass
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from homeassistant.helpers.update_coordinator import UpdateFailed
+
+from custom_components.extron.const import UNAVAILABLE_AFTER_SECONDS
+from custom_components.extron.coordinator import HDMISwitcherCoordinator, HDMISwitcherData, get_rollback
+
+
+@dataclass
+class Data:
+    input: int
+    volume: int
+
+
+class TestRollback(TestCase):
+    def test_failed_changes_are_rolled_back(self):
+        previous = Data(input=1, volume=40)
+
+        self.assertEqual({"volume": 40}, get_rollback(previous, Data(input=1, volume=45), {"volume": 45}))
+        self.assertEqual(
+            {"input": 1, "volume": 40}, get_rollback(previous, Data(input=2, volume=45), {"input": 2, "volume": 45})
+        )
+
+    def test_newer_values_are_kept(self):
+        # e.g. a notification arrived after the change was published
+        self.assertEqual({}, get_rollback(Data(input=1, volume=40), Data(input=1, volume=47), {"volume": 45}))
+
+
+class TestUnavailability(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.connection = MagicMock(is_rebooting=False)
+        self.connection.is_connected.return_value = True
+        self.connection.circuit_breaker.is_open = False
+
+        self.coordinator = HDMISwitcherCoordinator(
+            MagicMock(), MagicMock(options={}), self.connection, "test", False, MagicMock()
+        )
+        self.coordinator.data = HDMISwitcherData(input=1)
+        self.coordinator.query_data = AsyncMock(return_value=HDMISwitcherData(input=1))
+
+    async def update(self, now: float) -> HDMISwitcherData:
+        with patch("custom_components.extron.coordinator.time") as time:
+            time.monotonic.return_value = now
+            return await self.coordinator._async_update_data()
+
+    def fail_queries(self):
+        self.coordinator.query_data.side_effect = ConnectionError("Connection lost")
+
+    async def test_keeps_last_data_within_window(self):
+        await self.update(0)
+
+        # The first failed poll can be much longer than the window after the last successful one
+        self.fail_queries()
+        self.assertEqual(HDMISwitcherData(input=1), await self.update(3600))
+        self.assertEqual(HDMISwitcherData(input=1), await self.update(3600 + UNAVAILABLE_AFTER_SECONDS - 1))
+
+    async def test_fails_after_window(self):
+        self.fail_queries()
+        await self.update(100)
+
+        with self.assertRaises(UpdateFailed):
+            await self.update(100 + UNAVAILABLE_AFTER_SECONDS)
+
+    async def test_disconnected_without_due_queries_fails_after_window(self):
+        self.coordinator.query_data.return_value = None
+        self.connection.is_connected.return_value = False
+
+        self.assertEqual(HDMISwitcherData(input=1), await self.update(100))
+        with self.assertRaises(UpdateFailed):
+            await self.update(100 + UNAVAILABLE_AFTER_SECONDS)
+
+    async def test_window_resets_after_recovery(self):
+        self.fail_queries()
+        await self.update(0)
+
+        self.coordinator.query_data.side_effect = None
+        await self.update(UNAVAILABLE_AFTER_SECONDS - 1)
+
+        # A new outage gets a window of its own
+        self.fail_queries()
+        self.assertEqual(HDMISwitcherData(input=1), await self.update(UNAVAILABLE_AFTER_SECONDS))
+        self.assertEqual(HDMISwitcherData(input=1), await self.update(2 * UNAVAILABLE_AFTER_SECONDS - 1))
+        with self.assertRaises(UpdateFailed):
+            await self.update(2 * UNAVAILABLE_AFTER_SECONDS)
@@ -0,0 +1,68 @@
+import time
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from custom_components.extron.discovery import (
+    MAX_PROBED_ADDRESSES,
+    DiscoveredDevice,
+    discover_devices,
+    infer_device_type,
+    parse_addresses,
+)
+from tests.simulator import ExtronSimulator, SimulatedDeviceState
+
+
+class TestDiscovery(TestCase):
+    def test_parse_addresses(self):
+        self.assertEqual(["10.0.0.5"], parse_addresses("10.0.0.5"))
+        self.assertEqual(["10.0.0.5", "extron.local"], parse_addresses(" 10.0.0.5,extron.local 10.0.0.5 "))
+        self.assertEqual(
+            ["192.168.1.1", "192.168.1.2", "10.0.0.5"],
+            parse_addresses("192.168.1.0/30, 10.0.0.5"),
+        )
+        self.assertEqual(254, len(parse_addresses("192.168.1.0/24")))
+
+        with self.assertRaises(ValueError):
+            parse_addresses("10.0.0.0/16")
+        with self.assertRaises(ValueError):
+            parse_addresses("10.0.0.0/33")
+
+        self.assertEqual(1022, len(parse_addresses("10.0.0.0/22")))
+        self.assertLessEqual(1022, MAX_PROBED_ADDRESSES)
+
+    def test_parse_addresses_rejects_large_networks_quickly(self):
+        start = time.perf_counter()
+
+        for text in ("10.0.0.0/8", "2001:db8::/64", "10.0.0.0/22, 10.1.0.0/22"):
+            with self.assertRaises(ValueError):
+                parse_addresses(text)
+
+        # The networks are never expanded
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+    def test_infer_device_type(self):
+        self.assertEqual("surround_sound_processor", infer_device_type("SSP 200"))
+        self.assertEqual("hdmi_switcher", infer_device_type("SW4 HD 4K PLUS"))
+        self.assertEqual("matrix_switcher", infer_device_type("DXP 88 HDMI"))
+        self.assertEqual("matrix_switcher", infer_device_type("XTP II CrossPoint 1600"))
+        self.assertIsNone(infer_device_type("IN1608"))
+
+
+class TestDiscoverDevices(IsolatedAsyncioTestCase):
+    async def test_discover_devices(self):
+        simulator = ExtronSimulator(state=SimulatedDeviceState(model_name="DXP 88 HDMI"))
+        await simulator.start()
+
+        try:
+            # Nothing listens on the other address
+            devices, auth_failures = await discover_devices(
+                ["127.0.0.1", "127.0.0.2"], simulator.port, simulator.password, timeout=1
+            )
+        finally:
+            await simulator.close()
+
+        self.assertEqual(
+            [DiscoveredDevice("127.0.0.1", "DXP 88 HDMI", simulator.state.mac_address, "matrix_switcher")], devices
+        )
+        self.assertEqual(0, auth_failures)
+        self.assertEqual(1, simulator.connections_total)
@@ -0,0 +1,71 @@
+from dataclasses import dataclass
+from datetime import UTC, datetime
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from homeassistant.helpers.entity import Entity
+
+from custom_components.extron.entity import ExtronCoordinatorEntity
+
+
+@dataclass
+class Data:
+    input: int
+    muted: bool
+
+
+class InputEntity(ExtronCoordinatorEntity):
+    @property
+    def unique_id(self) -> str:
+        return "input"
+
+    @property
+    def state(self):
+        return self.coordinator.data.input
+
+
+class TestExtronCoordinatorEntity(TestCase):
+    def setUp(self):
+        self.coordinator = MagicMock(data=Data(input=1, muted=False), last_update_success=True, last_changed={})
+        self.entity = InputEntity(self.coordinator)
+
+        patcher = patch.object(Entity, "async_write_ha_state")
+        self.write_ha_state = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_only_changed_state_is_written(self):
+        self.entity._handle_coordinator_update()
+        self.assertEqual(1, self.write_ha_state.call_count)
+
+        # An update that only changes the state of another entity
+        self.coordinator.data = Data(input=1, muted=True)
+        self.entity._handle_coordinator_update()
+        self.assertEqual(1, self.write_ha_state.call_count)
+
+        self.coordinator.data = Data(input=2, muted=True)
+        self.entity._handle_coordinator_update()
+        self.assertEqual(2, self.write_ha_state.call_count)
+
+    def test_availability_changes_are_written(self):
+        self.entity._handle_coordinator_update()
+
+        self.coordinator.last_update_success = False
+        self.entity._handle_coordinator_update()
+        self.entity._handle_coordinator_update()
+        self.assertEqual(2, self.write_ha_state.call_count)
+
+    def test_last_changed_only_moves_on_change(self):
+        first = datetime(2024, 1, 1, 12, 0, tzinfo=UTC)
+        second = datetime(2024, 1, 1, 12, 5, tzinfo=UTC)
+
+        with patch("custom_components.extron.entity.dt_util.utcnow", side_effect=[first, second]):
+            self.entity.async_write_ha_state()
+            self.assertEqual(first, self.coordinator.last_changed["input"])
+
+            # Writing the same state again, e.g. when Home Assistant asks for it
+            self.entity.async_write_ha_state()
+            self.assertEqual(first, self.coordinator.last_changed["input"])
+
+            self.coordinator.data = Data(input=2, muted=False)
+            self.entity._handle_coordinator_update()
+            self.assertEqual(second, self.coordinator.last_changed["input"])
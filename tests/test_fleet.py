@@ -0,0 +1,77 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from custom_components.extron.fleet import Fleet, phase_for_slot
+
+
+class TestPhaseForSlot(TestCase):
+    def test_phases_are_spread(self):
+        for num_devices in (2, 5, 10, 50):
+            phases = sorted(phase_for_slot(slot) for slot in range(num_devices))
+            gaps = [b - a for a, b in zip(phases, phases[1:] + [phases[0] + 1], strict=True)]
+
+            # No two devices poll close to each other, relative to an even spread
+            self.assertGreater(min(gaps), 0.3 / num_devices)
+
+
+class TestFleet(IsolatedAsyncioTestCase):
+    async def test_refreshes_are_staggered(self):
+        loop = asyncio.get_running_loop()
+        fleet = Fleet(tick_interval=0.2, max_concurrent_sessions=2)
+        runs: dict[str, list[float]] = {"a": [], "b": []}
+
+        def make_refresh(name: str):
+            async def refresh():
+                runs[name].append(loop.time())
+
+            return refresh
+
+        start = loop.time()
+        remove_a = fleet.add(make_refresh("a"))
+        remove_b = fleet.add(make_refresh("b"))
+        await asyncio.sleep(0.45)
+
+        remove_a()
+        remove_b()
+        self.assertEqual(0, len(fleet))
+
+        # Both run once per tick, but not at the same time
+        self.assertEqual(3, len(runs["a"]))
+        self.assertEqual(2, len(runs["b"]))
+        self.assertAlmostEqual(0.2 * phase_for_slot(1), runs["b"][0] - start, delta=0.05)
+
+        # Nothing runs after removal
+        await asyncio.sleep(0.3)
+        self.assertEqual(5, len(runs["a"]) + len(runs["b"]))
+
+    async def test_busy_members_skip_ticks(self):
+        fleet = Fleet(tick_interval=0.02, max_concurrent_sessions=1)
+        started = 0
+
+        async def slow_refresh():
+            nonlocal started
+            started += 1
+            await asyncio.sleep(0.1)
+
+        remove = fleet.add(slow_refresh)
+        await asyncio.sleep(0.15)
+        remove()
+
+        self.assertEqual(2, started)
+
+    async def test_freed_slots_are_reused(self):
+        fleet = Fleet(tick_interval=10, max_concurrent_sessions=1)
+
+        async def refresh():
+            pass
+
+        remove_a = fleet.add(refresh)
+        remove_b = fleet.add(refresh)
+        remove_a()
+        remove_c = fleet.add(refresh)
+
+        # The new member takes slot 0, whose phase is free again
+        self.assertEqual(2, len(fleet))
+        remove_b()
+        remove_c()
@@ -0,0 +1,71 @@
+import time
+
+from array import array
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from pyextron import ExtronDevice
+
+from custom_components.extron.connection import ExtronConnection
+from custom_components.extron.matrix import (
+    diff_ties,
+    parse_matrix_size,
+    parse_tie_table,
+    tie_command,
+    tie_table_queries,
+)
+from tests.simulator import ExtronSimulator, SimulatedDeviceState
+
+
+class TestMatrix(TestCase):
+    def test_parse_matrix_size(self):
+        self.assertEqual((8, 4), parse_matrix_size("V8X4 A8X4"))
+        self.assertEqual((32, 32), parse_matrix_size("Vid32X32 Aud32X32"))
+
+        with self.assertRaises(ValueError):
+            parse_matrix_size("E10")
+
+    def test_tie_table_queries(self):
+        self.assertEqual(["\x1b" + "0*1*1VC"], tie_table_queries(8))
+        self.assertEqual(["\x1b" + "0*1*1VC", "\x1b" + "0*17*1VC"], tie_table_queries(32))
+
+    def test_parse_tie_table(self):
+        self.assertEqual(array("H", [1, 2, 0, 4]), parse_tie_table(["01 02 00 04 05 06 07 08 Vid"], 4))
+        self.assertEqual(
+            array("H", range(1, 21)), parse_tie_table([" ".join(map(str, range(1, 17))), "17 18 19 20"], 20)
+        )
+
+        with self.assertRaises(ValueError):
+            parse_tie_table(["01 02"], 4)
+
+    def test_diff_ties(self):
+        current = array("H", [1, 2, 3, 4])
+
+        self.assertEqual({2: 1, 4: 0}, diff_ties(current, {1: 1, 2: 1, 3: 3, 4: 0}))
+        self.assertEqual({}, diff_ties(current, {1: 1}))
+        self.assertEqual("3*2!", tie_command(3, 2))
+
+
+class TestMatrixWithSimulator(IsolatedAsyncioTestCase):
+    async def test_tie_table_is_read_in_one_round_trip(self):
+        state = SimulatedDeviceState(model_name="DXP 3232 HDMI", num_inputs=32, ties=list(range(1, 33)))
+        simulator = ExtronSimulator(state=state, rtt=0.05)
+        await simulator.start()
+
+        connection = ExtronConnection(ExtronDevice("127.0.0.1", simulator.port, simulator.password), timeout=2)
+        await connection.connect()
+
+        try:
+            self.assertEqual((32, 32), parse_matrix_size(await connection.run_command("I")))
+            self.assertEqual("Out05 In07 All", await connection.run_command(tie_command(7, 5)))
+
+            start = time.monotonic()
+            queries = tie_table_queries(32)
+            ties = parse_tie_table(await connection.run_commands(queries), 32)
+            elapsed = time.monotonic() - start
+
+            self.assertEqual(7, ties[4])
+            self.assertEqual(list(range(6, 33)), list(ties[5:]))
+            self.assertLess(elapsed, 2 * simulator.rtt)
+        finally:
+            await connection.close()
+            await simulator.close()
@@ -1,6 +1,14 @@
-from unittest import TestCase
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock
 
-from custom_components.extron.media_player import make_source_bidict
+from homeassistant.exceptions import ServiceValidationError
+
+from custom_components.extron.media_player import (
+    ExtronHDMISwitcher,
+    ExtronMatrixSwitcherOutput,
+    make_source_bidict,
+    resolve_source,
+)
 
 
 class TestSourceBidict(TestCase):
@@ -24,3 +32,52 @@ class TestSourceBidict(TestCase):
         self.assertEqual(2, len(bd.values()))
         self.assertEqual("foo", bd.get(1))
         self.assertEqual("bar", bd.get(2))
+
+
+class TestResolveSource(TestCase):
+    def test_resolve_source(self):
+        bd = make_source_bidict(4, ["foo", "bar"])
+
+        self.assertEqual(1, resolve_source(bd, "foo"))
+        self.assertEqual(3, resolve_source(bd, "3"))
+        self.assertEqual(4, resolve_source(bd, 4))
+
+        with self.assertRaises(ServiceValidationError):
+            resolve_source(bd, "baz")
+        with self.assertRaises(ServiceValidationError):
+            resolve_source(bd, 5)
+
+        # Only matrix switcher outputs can be untied
+        with self.assertRaises(ServiceValidationError):
+            resolve_source(bd, 0)
+        self.assertEqual(0, resolve_source(bd, 0, allow_untie=True))
+
+
+class TestApplyScene(IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.device_information = MagicMock(model_name="Test")
+        self.device_information.capabilities.num_inputs = 4
+
+    async def test_hdmi_switcher_rejects_volume(self):
+        coordinator = MagicMock(async_apply_state=AsyncMock())
+        switcher = ExtronHDMISwitcher(coordinator, self.device_information, [])
+
+        with self.assertRaises(ServiceValidationError):
+            await switcher.async_apply_scene(source="2", volume_level=0.5)
+        with self.assertRaises(ServiceValidationError):
+            await switcher.async_apply_scene(source="2", ties={2: "3"})
+        coordinator.async_apply_state.assert_not_called()
+
+        await switcher.async_apply_scene(source="2")
+        coordinator.async_apply_state.assert_awaited_once_with(input=2)
+
+    async def test_matrix_switcher_output_rejects_volume(self):
+        coordinator = MagicMock(num_inputs=4, num_outputs=4, async_apply_ties=AsyncMock())
+        output = ExtronMatrixSwitcherOutput(coordinator, self.device_information, [], 1)
+
+        with self.assertRaises(ServiceValidationError):
+            await output.async_apply_scene(source="2", is_volume_muted=True)
+        coordinator.async_apply_ties.assert_not_called()
+
+        await output.async_apply_scene(source="2", ties={2: "3"})
+        coordinator.async_apply_ties.assert_awaited_once_with({2: 3, 1: 2})
@@ -0,0 +1,37 @@
+from unittest import TestCase
+
+from custom_components.extron.metrics import ConnectionMetrics, Histogram, command_code
+
+
+class TestMetrics(TestCase):
+    def test_command_code(self):
+        self.assertEqual("#V", command_code("40V"))
+        self.assertEqual("#$", command_code("3$"))
+        self.assertEqual("#*#!", command_code("3*12!"))
+        self.assertEqual("V", command_code("V"))
+        self.assertEqual("+V", command_code("+V"))
+        self.assertEqual("Esc20STAT", command_code("\x1b" + "20STAT"))
+        self.assertEqual("Esc1BOOT", command_code("\x1b" + "1BOOT"))
+
+    def test_histogram(self):
+        histogram = Histogram((10, 100))
+        self.assertIsNone(histogram.mean)
+
+        for value in (5, 10, 50, 500):
+            histogram.observe(value)
+
+        self.assertEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(141.25, histogram.mean)
+        self.assertEqual(500, histogram.max)
+        self.assertEqual({"<=10": 2, "<=100": 1, ">100": 1}, histogram.as_dict()["buckets"])
+
+    def test_record_command(self):
+        metrics = ConnectionMetrics()
+        metrics.record_command("40V", 0.02)
+        metrics.record_command("41V", 0.03)
+        metrics.record_command("$", 0.01)
+
+        self.assertEqual(3, metrics.commands_sent)
+        self.assertEqual({"#V": 2, "$": 1}, metrics.as_dict()["commands"])
+        self.assertEqual({"#V": 50.0, "$": 10.0}, metrics.as_dict()["command_time_ms"])
+        self.assertEqual(3, metrics.round_trip_time.count)
@@ -0,0 +1,33 @@
+from unittest import TestCase
+
+from custom_components.extron.notification import Notification, expects_tagged_response, parse_notification
+
+
+class TestNotification(TestCase):
+    def test_parse_notification(self):
+        self.assertEqual(Notification("input", 2), parse_notification("In2 All"))
+        self.assertEqual(Notification("input", 12), parse_notification("In12"))
+        self.assertEqual(Notification("volume", 40), parse_notification("Vol40"))
+        self.assertEqual(Notification("muted", True), parse_notification("Amt1"))
+        self.assertEqual(Notification("muted", False), parse_notification("Amt0"))
+        self.assertEqual(Notification("input_hdcp_status", 1), parse_notification("HdcpI1"))
+        self.assertEqual(Notification("output_hdcp_status", 0), parse_notification("HdcpO0"))
+        self.assertEqual(Notification("tie", (2, 3)), parse_notification("Out02 In03 All"))
+        self.assertEqual(Notification("tie", (12, 0)), parse_notification("Out12 In00 All"))
+
+        # Plain query responses are not notifications
+        self.assertIsNone(parse_notification("2"))
+        self.assertIsNone(parse_notification("2160*30.002735*67.485909*3840"))
+
+    def test_expects_tagged_response(self):
+        self.assertTrue(expects_tagged_response("3$"))
+        self.assertTrue(expects_tagged_response("2!"))
+        self.assertTrue(expects_tagged_response("40V"))
+        self.assertTrue(expects_tagged_response("+V"))
+        self.assertTrue(expects_tagged_response("1Z"))
+        self.assertTrue(expects_tagged_response("3*2!"))
+
+        self.assertFalse(expects_tagged_response("$"))
+        self.assertFalse(expects_tagged_response("V"))
+        self.assertFalse(expects_tagged_response("34I"))
+        self.assertFalse(expects_tagged_response("\x1b" + "IHDCP"))
@@ -0,0 +1,83 @@
+import tempfile
+
+from pathlib import Path
+from unittest import IsolatedAsyncioTestCase
+
+from pyextron import ExtronDevice
+
+from custom_components.extron.connection import ExtronConnection, ResponseError
+from custom_components.extron.recorder import REDACTED, TrafficRecorder, read_trace
+from tests.replay import replay
+from tests.simulator import ExtronSimulator
+
+
+class TestRecorder(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "trace.jsonl"
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    async def test_record_and_replay(self):
+        simulator = ExtronSimulator(password="secret", rtt=0.02)
+        await simulator.start()
+        recorder = TrafficRecorder(self.path, max_bytes=1024 * 1024, secrets=["secret"])
+        connection = ExtronConnection(ExtronDevice("127.0.0.1", simulator.port, "secret"), recorder=recorder)
+        await connection.connect()
+
+        await connection.run_commands(["$", "V", "Z"], background=True)
+        await connection.run_command("3$")
+        # A password sent as a line of its own is redacted too
+        with self.assertRaises(ResponseError):
+            await connection.run_command("secret")
+
+        await connection.close()
+        await simulator.close()
+
+        trace = read_trace(self.path)
+        self.assertNotIn("secret", self.path.read_text())
+        self.assertIn(REDACTED, self.path.read_text())
+        self.assertEqual(
+            ["connect", "close"], [event["event"] for event in trace if event["event"] in ("connect", "close")]
+        )
+        requests = [event for event in trace if event["event"] == "request"]
+        self.assertEqual([["$", "V", "Z"], ["3$"]], [request["commands"] for request in requests[:2]])
+        self.assertEqual("E10", [event for event in trace if event["event"] == "response"][-1]["response"])
+
+        # The stand-in answers with the recorded responses
+        result = await replay(trace, speed=10)
+        self.assertEqual(3, result.num_requests)
+        # Including the rejected command, which is rejected again
+        self.assertEqual(1, result.failed_requests)
+        self.assertEqual(2, len(result.replayed_latencies))
+
+    async def test_short_secrets_only_redact_whole_values(self):
+        recorder = TrafficRecorder(self.path, max_bytes=1024 * 1024, secrets=["1"])
+
+        recorder.record("request", commands=["1", "1$"], background=False, latency_ms=10.5, error=None)
+        recorder.record("response", command="1$", response="In1 All", rtt_ms=10.1)
+        recorder.record(
+            "request", commands=["1"], background=False, latency_ms=1.0, error="ResponseError(\"Command '1'\")"
+        )
+        await recorder.close()
+
+        events = read_trace(self.path)
+        self.assertEqual([REDACTED, "1$"], events[0]["commands"])
+        self.assertEqual(10.5, events[0]["latency_ms"])
+        self.assertEqual(
+            {"command": "1$", "response": "In1 All", "rtt_ms": 10.1},
+            {name: value for name, value in events[1].items() if name not in ("t", "event")},
+        )
+        self.assertEqual(f"ResponseError(\"Command '{REDACTED}'\")", events[2]["error"])
+
+    async def test_rotation(self):
+        recorder = TrafficRecorder(self.path, max_bytes=100, secrets=[])
+
+        for _ in range(3):
+            recorder.record("timeout", padding="x" * 100)
+            await recorder.close()
+
+        # Only the current file and the one before it are kept
+        self.assertEqual(1, len(read_trace(self.path)))
+        self.assertEqual(1, len(read_trace(self.path.with_name("trace.jsonl.1"))))
@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from custom_components.extron.scheduler import AdaptivePollingScheduler, PollingPolicy
+
+
+class TestAdaptivePollingScheduler(TestCase):
+    def test_backoff(self):
+        scheduler = AdaptivePollingScheduler({"V": PollingPolicy(interval=10, max_interval=40)})
+        self.assertEqual(["V"], scheduler.due(0))
+
+        # The first value counts as a change
+        scheduler.record("V", True, 0)
+        self.assertEqual([], scheduler.due(5))
+        self.assertEqual(["V"], scheduler.due(10))
+
+        # Unchanged values back off up to the maximum interval
+        scheduler.record("V", False, 10)
+        self.assertEqual(20, scheduler.get_interval("V"))
+        scheduler.record("V", False, 30)
+        self.assertEqual(40, scheduler.get_interval("V"))
+        scheduler.record("V", False, 70)
+        self.assertEqual(40, scheduler.get_interval("V"))
+        self.assertEqual([], scheduler.due(100))
+        self.assertEqual(["V"], scheduler.due(110))
+
+        # A change speeds polling back up
+        scheduler.record("V", True, 110)
+        self.assertEqual(10, scheduler.get_interval("V"))
+
+    def test_reset(self):
+        scheduler = AdaptivePollingScheduler({"V": PollingPolicy(interval=10, max_interval=100)})
+        scheduler.record("V", True, 0)
+        scheduler.record("V", False, 10)
+        scheduler.record("V", False, 30)
+        self.assertEqual(40, scheduler.get_interval("V"))
+
+        scheduler.reset(35)
+        self.assertEqual(10, scheduler.get_interval("V"))
+        self.assertEqual(["V"], scheduler.due(45))
+
+    def test_expire(self):
+        scheduler = AdaptivePollingScheduler({"V": PollingPolicy(interval=10, max_interval=100)})
+        scheduler.record("V", False, 0)
+        self.assertEqual([], scheduler.due(5))
+
+        scheduler.expire()
+        self.assertEqual(10, scheduler.get_interval("V"))
+        self.assertEqual(["V"], scheduler.due(5))
+
+    def test_paused(self):
+        scheduler = AdaptivePollingScheduler(
+            {
+                "34I": PollingPolicy(interval=10, max_interval=10, paused=lambda data: data["source"] is None),
+                "$": PollingPolicy(interval=10, max_interval=10),
+            }
+        )
+        self.assertEqual(["$"], scheduler.due(0, {"source": None}))
+        self.assertEqual(["34I", "$"], scheduler.due(0, {"source": 1}))
+
+        # Without data (first refresh) nothing is paused
+        self.assertEqual(["34I", "$"], scheduler.due(0))
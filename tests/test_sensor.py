@@ -1,14 +1,17 @@
 import unittest
 
-from custom_components.extron.sensor import parse_incoming_line_count
+from custom_components.extron.codec import VideoTiming
+from custom_components.extron.sensor import format_video_timing
 
 
 class TestSensors(unittest.TestCase):
-    def test_parse_incoming_line_count(self):
-        incoming_line_count = "2160*30.002735*67.485909*3840"
+    def test_format_video_timing(self):
+        video_timing = VideoTiming(
+            lines=2160, vertical_frequency=30.002735, horizontal_frequency=67.485909, pixels=3840
+        )
 
-        self.assertEqual("3840 x 2160 @ 30 Hz", parse_incoming_line_count(incoming_line_count))
+        self.assertEqual("3840 x 2160 @ 30 Hz", format_video_timing(video_timing))
 
 
-if __name__ == '__main__':
+if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,40 @@
+from unittest import TestCase
+
+from custom_components.extron.statistics import Deadband, DurationCounter
+
+
+class TestStatistics(TestCase):
+    def test_deadband(self):
+        deadband = Deadband(1, max_hold=100)
+
+        self.assertTrue(deadband.update(40, 0))
+        self.assertFalse(deadband.update(41, 10))
+        self.assertFalse(deadband.update(39, 20))
+        self.assertEqual(40, deadband.value)
+        self.assertTrue(deadband.update(42, 30))
+        self.assertEqual(42, deadband.value)
+        self.assertTrue(deadband.update(None, 40))
+        self.assertFalse(deadband.update(None, 50))
+
+    def test_deadband_publishes_sustained_changes(self):
+        deadband = Deadband(1, max_hold=100)
+        deadband.update(40, 0)
+
+        # Flipping back to the published value restarts the hold time
+        self.assertFalse(deadband.update(41, 10))
+        self.assertFalse(deadband.update(40, 60))
+        self.assertFalse(deadband.update(41, 100))
+        self.assertFalse(deadband.update(41, 150))
+        self.assertTrue(deadband.update(41, 200))
+        self.assertEqual(41, deadband.value)
+
+    def test_duration_counter(self):
+        counter = DurationCounter(total=10)
+
+        self.assertFalse(counter.update(False, 100))
+        self.assertEqual(10, counter.total(150))
+        self.assertTrue(counter.update(True, 200))
+        self.assertFalse(counter.update(True, 250))
+        self.assertEqual(70, counter.total(260))
+        self.assertTrue(counter.update(False, 300))
+        self.assertEqual(110, counter.total(1000))
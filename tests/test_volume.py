@@ -0,0 +1,108 @@
+import asyncio
+
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from custom_components.extron.volume import VolumeController, plan_ramp
+
+
+class TestPlanRamp(TestCase):
+    def test_plan_ramp(self):
+        # One command per volume step when the rate allows it
+        self.assertEqual([11, 12, 13, 14], plan_ramp(10, 14, 1, 10))
+
+        # The number of commands is limited by the rate
+        self.assertEqual([20, 30, 40], plan_ramp(10, 40, 0.3, 10))
+        self.assertEqual([30, 20, 10], plan_ramp(40, 10, 0.3, 10))
+
+        # Very short ramps still reach the target
+        self.assertEqual([40], plan_ramp(10, 40, 0, 10))
+        self.assertEqual([40], plan_ramp(40, 40, 3, 10))
+
+
+class TestVolumeController(IsolatedAsyncioTestCase):
+    async def test_steps_are_coalesced(self):
+        sent = []
+
+        async def send_volume(level: int, _confirmed: int | None):
+            sent.append(level)
+
+        controller = VolumeController(send_volume, debounce=0.01)
+        for _ in range(5):
+            controller.step(50, 1)
+        self.assertEqual(55, controller.pending_target)
+
+        await asyncio.sleep(0.05)
+        self.assertEqual([55], sent)
+        self.assertIsNone(controller.pending_target)
+
+    async def test_steps_are_clamped(self):
+        sent = []
+
+        async def send_volume(level: int, _confirmed: int | None):
+            sent.append(level)
+
+        controller = VolumeController(send_volume, debounce=0.01)
+        controller.step(99, 1)
+        controller.step(99, 1)
+
+        await asyncio.sleep(0.05)
+        self.assertEqual([100], sent)
+
+    async def test_ramp(self):
+        sent = []
+
+        async def send_volume(level: int, _confirmed: int | None):
+            sent.append(level)
+
+        controller = VolumeController(send_volume, max_commands_per_second=100)
+        await controller.ramp(10, 13, 0.03)
+        self.assertEqual([11, 12, 13], sent)
+
+    async def test_step_supersedes_ramp(self):
+        sent = []
+
+        async def send_volume(level: int, _confirmed: int | None):
+            sent.append(level)
+
+        controller = VolumeController(send_volume, debounce=0.01, max_commands_per_second=10)
+        ramp = asyncio.create_task(controller.ramp(50, 100, 10))
+        await asyncio.sleep(0.01)
+        controller.step(sent[-1], -1)
+
+        # The superseded ramp returns without an error
+        await ramp
+        await asyncio.sleep(0.05)
+        self.assertEqual([51, 50], sent)
+
+    async def test_failed_step_rolls_back_to_confirmed_volume(self):
+        sent = []
+
+        async def send_volume(level: int, confirmed: int | None):
+            sent.append((level, confirmed))
+            if level > 52:
+                raise ConnectionError()
+
+        controller = VolumeController(send_volume, debounce=0.01, max_commands_per_second=100)
+        controller.step(50, 1)
+        # The published target is passed as the current volume while the burst is in progress
+        controller.step(51, 1)
+        await asyncio.sleep(0.05)
+
+        # The next burst starts from the accepted level, the rejected one reports it as the level to roll back to
+        controller.step(52, 1)
+        await asyncio.sleep(0.05)
+
+        self.assertEqual([(52, 50), (53, 52)], sent)
+
+    async def test_ramp_passes_last_accepted_level(self):
+        sent = []
+
+        async def send_volume(level: int, confirmed: int | None):
+            sent.append((level, confirmed))
+
+        controller = VolumeController(send_volume, max_commands_per_second=100)
+        await controller.ramp(10, 13, 0.03)
+        self.assertEqual([(11, 10), (12, 11), (13, 12)], sent)
+
+        # Nothing is in progress anymore
+        self.assertIsNone(controller.cancel())